@@ -0,0 +1,108 @@
+import os
+from itertools import islice
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from DroneNavigator import DroneNavigator
+from LocalFrame import LocalFrame
+from ObstacleAvoidance import ObstacleAvoidance
+from Point import Point,PolygonZone,RedZone
+from SparsePath import SparsePath
+from VisibilityGraphPlanner import VisibilityGraphPlanner
+from Visualizer import NullVisualizer
+
+
+@dataclass
+class BatchResult:
+    index: int
+    start: Point
+    goal: Point
+    path: SparsePath
+    cost_km: float
+    valid: bool
+
+
+class BatchPlanner:
+    """
+    Plans many (start, goal, yaw) missions against one shared zone set and fence.
+
+    The red-zone index, zone arrays, fence slabs and visibility-graph nodes are built once here and
+    reused by every mission instead of once per DroneNavigator. With processes > 1 the planner is
+    shipped to each worker once, through the pool initializer, and missions are streamed to the
+    workers in small chunks within a bounded window; results are yielded as their chunk completes,
+    tagged with the index of their mission in the input.
+    """
+
+    def __init__(self, red_zones: List[RedZone], boundary_points: List[Point], planner: str = 'greedy',
+                 processes: Optional[int] = None, projection: str = 'geodetic', no_fly_zones: Iterable[PolygonZone] = (),
+                 max_iterations: int = 3, chunk_size: int = 8, ground_speed_mps: Optional[float] = None):
+        if planner not in DroneNavigator.PLANNERS:
+            raise ValueError(f"Unknown planner {planner!r}, expected one of {DroneNavigator.PLANNERS}")
+        if projection not in DroneNavigator.PROJECTIONS:
+            raise ValueError(f"Unknown projection {projection!r}, expected one of {DroneNavigator.PROJECTIONS}")
+        no_fly_zones = list(no_fly_zones)
+        # Missions differ, so an 'enu' frame is centred on what they share: the zones and the fence
+        frame = LocalFrame.from_points([zone.center for zone in red_zones] + list(boundary_points) +
+                                       [vertex for zone in no_fly_zones for vertex in zone.vertices]) if projection == 'enu' else None
+        self.red_zones = list(red_zones)
+        self.boundary_points = boundary_points
+        self.planner = planner
+        self.max_iterations = max_iterations
+        self.processes = os.cpu_count() if processes is None else processes
+        # Missions per worker task; a single plan takes milliseconds, so per-task IPC would dominate otherwise
+        self.chunk_size = chunk_size
+        self.obstacle_avoidance = ObstacleAvoidance(self.red_zones, boundary_points, frame=frame, no_fly_zones=no_fly_zones,
+                                                    ground_speed_mps=ground_speed_mps)
+        self.graph_planner = VisibilityGraphPlanner(self.obstacle_avoidance, boundary_points)
+
+    def plan_one(self, index: int, start: Point, goal: Point, yaw: float) -> BatchResult:
+        navigator = DroneNavigator(start, goal, self.red_zones, yaw, self.boundary_points, self.max_iterations, self.planner,
+                                   visualizer=NullVisualizer, obstacle_avoidance=self.obstacle_avoidance,
+                                   graph_planner=self.graph_planner)
+        path = navigator.plan()
+        return BatchResult(index, start, goal, path, path.length_km(), self.obstacle_avoidance.is_path_valid(path.vertices))
+
+    def plan_all(self, missions: Iterable[Tuple[Point, Point, float]]) -> Iterator[BatchResult]:
+        """
+        :param missions: (start, goal, yaw) tuples; consumed lazily
+        :return: Results in completion order; with a single process that is input order
+        """
+        if self.processes <= 1:
+            for index, (start, goal, yaw) in enumerate(missions):
+                yield self.plan_one(index, start, goal, yaw)
+            return
+
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        # Keep a few chunks queued per worker so none idles, without materializing the whole input
+        window = self.processes * 2
+        numbered = ((index, start, goal, yaw) for index, (start, goal, yaw) in enumerate(missions))
+        with ProcessPoolExecutor(self.processes, initializer=_init_worker, initargs=(self,)) as executor:
+            running = set()
+            for chunk in iter(lambda: list(islice(numbered, self.chunk_size)), []):
+                running.add(executor.submit(_plan_in_worker, chunk))
+                if len(running) >= window:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+    def costs_to_targets(self, start: Point, yaw: float, targets: Iterable[Point]) -> List[BatchResult]:
+        # Target assignment: one drone against every candidate target, back in target order
+        results = list(self.plan_all((start, target, yaw) for target in targets))
+        return sorted(results, key=lambda result: result.index)
+
+
+_worker_planner: Optional[BatchPlanner] = None
+
+
+def _init_worker(planner: BatchPlanner) -> None:
+    global _worker_planner
+    _worker_planner = planner
+
+
+def _plan_in_worker(chunk: List[Tuple[int, Point, Point, float]]) -> List[BatchResult]:
+    return [_worker_planner.plan_one(*mission) for mission in chunk]
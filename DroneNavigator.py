@@ -1,98 +1,378 @@
-from typing import Generator, List
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Generator, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
 from GeographicUtils import GeographicUtils
+from Instrumentation import Instrumentation
+from LocalFrame import LocalFrame
 from ObstacleAvoidance import ObstacleAvoidance
 from PathAdjuster import PathAdjuster
-from Point import Point,RedZone
-from Visualizer import Visualizer
+from Point import Point,PolygonZone,RedZone
+from Visualizer import NullVisualizer, Visualizer
 from PathPlanner import PathPlanner
+from SparsePath import SparsePath
+
+if TYPE_CHECKING:
+    # Only needed for annotations; the modules themselves are imported on first use to keep startup cheap
+    from concurrent.futures import Executor, Future
+    from PathSmoother import PathSmoother
+    from VisibilityGraphPlanner import VisibilityGraphPlanner
+
+
+@dataclass
+class PlanResult:
+    path: SparsePath
+    # 'optimal': the full visibility-graph search finished, more time would not improve the path;
+    # 'feasible': a valid path (clear and inside the fence), but refinement was cut short or found nothing;
+    # 'fallback': nothing valid within the budget
+    status: str
+    elapsed_ms: float
 
 
 class DroneNavigator:
-    def __init__(self, start: Point, goal: Point, red_zones: List[RedZone], current_yaw : float,boundary_points:List[Point], max_iterations: int = 3) -> None:
+    PLANNERS = ('greedy', 'visibility')
+    PROJECTIONS = ('geodetic', 'enu')
+
+    def __init__(self, start: Point, goal: Point, red_zones: List[RedZone], current_yaw : float,boundary_points:List[Point], max_iterations: int = 3, planner: str = 'greedy', executor: Optional['Executor'] = None,
+                 visualizer=Visualizer, projection: str = 'geodetic', no_fly_zones: Iterable[PolygonZone] = (),
+                 obstacle_avoidance: Optional[ObstacleAvoidance] = None, graph_planner: Optional['VisibilityGraphPlanner'] = None,
+                 smoother: Optional['PathSmoother'] = None, ground_speed_mps: Optional[float] = None,
+                 departure_time_s: float = 0.0, adaptive_step: bool = False) -> None:
+        if planner not in self.PLANNERS:
+            raise ValueError(f"Unknown planner {planner!r}, expected one of {self.PLANNERS}")
+        if projection not in self.PROJECTIONS:
+            raise ValueError(f"Unknown projection {projection!r}, expected one of {self.PROJECTIONS}")
+        if obstacle_avoidance is not None:
+            # Zone and fence preprocessing shared with other navigators (see BatchPlanner); it fixes the projection too
+            self.frame = obstacle_avoidance.frame
+        else:
+            no_fly_zones = list(no_fly_zones)
+            # 'enu' projects the mission once into a flat frame around its centroid for all segment math
+            mission_points = [start, goal] + [zone.center for zone in red_zones] + list(boundary_points) + [vertex for zone in no_fly_zones for vertex in zone.vertices]
+            self.frame = LocalFrame.from_points(mission_points) if projection == 'enu' else None
+            obstacle_avoidance = ObstacleAvoidance(red_zones, boundary_points, frame=self.frame, no_fly_zones=no_fly_zones,
+                                                   ground_speed_mps=ground_speed_mps)
+        if ground_speed_mps is not None:
+            obstacle_avoidance.ground_speed_mps = ground_speed_mps
+        # Moving and time-windowed zones are checked against the drone's timing, counted from here
+        obstacle_avoidance.set_departure(start, departure_time_s)
         self.start = start
         self.goal = goal
         self.red_zones = red_zones
         self.max_iterations = max_iterations
-        self.path_planner = PathPlanner(start, goal, red_zones,boundary_points)
-        self.obstacle_avoidance = ObstacleAvoidance(red_zones, boundary_points)
+        self.obstacle_avoidance = obstacle_avoidance
+        self.path_planner = PathPlanner(start, goal, red_zones,boundary_points, obstacle_avoidance=self.obstacle_avoidance, frame=self.frame,
+                                        adaptive_step=adaptive_step)
         self.current_yaw = current_yaw
         self.Max_turn_angle = 7
         self.boundary_points = boundary_points
+        self.planner = planner
+        # Built on first use by the graph_planner property, so greedy-only callers never import it
+        self._graph_planner = graph_planner
+        # Optional thread/process pool for evaluating independent branches concurrently
+        self.executor = executor
+        # Anything with Visualizer.plot_path's signature: Visualizer, NullVisualizer, a FileVisualizer instance
+        self.visualizer = visualizer
+        # When set, navigate() flies the turn-rate-limited fillet path instead of the sharp-cornered one
+        self.smoother = smoother
+        self.sharp_corners: List[int] = []
+        # Zone set handed over by submit_red_zones, applied by navigate_streaming between windows
+        self._pending_red_zones: Optional[List[RedZone]] = None
+        self.middle_points_list = []
+        self.turn_branches = None
+        # Branch starts where the visibility search found nothing and the direct path stood in for it
+        self.visibility_fallbacks: Set[Point] = set()
+        self.path: Optional[SparsePath] = None
+
+    @property
+    def graph_planner(self) -> 'VisibilityGraphPlanner':
+        if self._graph_planner is None:
+            from VisibilityGraphPlanner import VisibilityGraphPlanner
+            self._graph_planner = VisibilityGraphPlanner(self.obstacle_avoidance, self.boundary_points)
+        return self._graph_planner
+
+    def submit_red_zones(self, red_zones: List[RedZone]) -> None:
+        # Safe to call from any thread; the latest set wins
+        self._pending_red_zones = list(red_zones)
+
+    def __getstate__(self) -> dict:
+        # Pools can't be pickled; a navigator shipped to a worker process evaluates sequentially
+        # and never plots
+        state = self.__dict__.copy()
+        state['executor'] = None
+        state['visualizer'] = NullVisualizer
+        return state
+
+    def _map(self, function: Callable, *iterables) -> list:
+        # Results come back in submission order, so picking among them stays deterministic
+        if self.executor is None:
+            return list(map(function, *iterables))
+        return list(self.executor.map(function, *iterables))
+
+    def generate_path(self,start) -> SparsePath:
+        path, self.middle_points_list = self.plan_branch(start)
+        return path
+
+    def evaluate_candidate(self, start: Point, point: Point, middle_points: List[Point]) -> Tuple[SparsePath, Optional[int], bool]:
+        path, last_middle_point_index = self.path_planner.generate_sparse_path(start, [point] + middle_points, self.goal)
+        return path, last_middle_point_index, self.obstacle_avoidance.path_is_clear_of_red_zones(path.vertices)
+
+    def plan_branch(self, start: Point, parallel_candidates: bool = True, planner: Optional[str] = None,
+                    deadline: Optional[float] = None) -> Tuple[SparsePath, List[Point]]:
+        with Instrumentation.timer('plan_branch'):
+            if (planner or self.planner) == 'visibility':
+                return self.generate_path_visibility(start, deadline)
+            return self.generate_path_greedy(start, parallel_candidates, deadline)
 
-    def generate_path(self,start) -> List[Point]:
-        path = self.path_planner.generate_waypoints(start, self.goal)
-        path_clear = self.obstacle_avoidance.path_is_clear_of_red_zones(path)
+    def generate_path_greedy(self, start: Point, parallel_candidates: bool = True, deadline: Optional[float] = None) -> Tuple[SparsePath, List[Point]]:
+        path = self.path_planner.generate_path_through([start, self.goal])
+        path_clear = self.obstacle_avoidance.path_is_clear_of_red_zones(path.vertices)
         iteration = 0
-        self.middle_points_list = []
+        middle_points_list = []
         preferred_point,alternative_point = None,None
         last_middle_point_index = None
         
 
-        while not path_clear and iteration < self.max_iterations:
+        while not path_clear and iteration < self.max_iterations and (deadline is None or time.monotonic() < deadline):
             # Implement obstacle avoidance logic here
-            _, zone_details = self.obstacle_avoidance.find_first_red_zone_point(path)
-            
-            print(f"Zone details: {zone_details.radius,zone_details.center.lat,zone_details.center.lon}")
-            
-            
-            last_idx = last_middle_point_index - 2 if last_middle_point_index else -2
-            current_bearing = GeographicUtils.calculate_bearing(path[last_idx], path[last_idx + 1])
-            print(f"Current bearing: {current_bearing}")
+            _, zone_details = self.obstacle_avoidance.find_first_red_zone_point(path.vertices)
+            Instrumentation.count('iterations')
+            if Instrumentation.enabled:
+                Instrumentation.event('blocking_zone', iteration=iteration, zone=zone_details.id, radius=zone_details.radius,
+                                      center=[zone_details.center.lat, zone_details.center.lon])
             
-                        
-            target_point = self.middle_points_list[-1] if self.middle_points_list else self.goal
-            point_right, point_left = self.path_planner.get_points_around_middle_point(zone_details, target_point, current_bearing)
-            print(f"Point right: {point_right.lat, point_right.lon} - Point left: {point_left.lat, point_left.lon}")
+            # Heading on arrival at the last middle point (or at the goal), i.e. the reversed leg bearing flipped
+            last_idx = last_middle_point_index if last_middle_point_index else len(path) - 1
+            current_bearing = (GeographicUtils.calculate_bearing(path[last_idx], path[last_idx - 1]) + 180) % 360
             
+            target_point = middle_points_list[-1] if middle_points_list else self.goal
+            with Instrumentation.timer('get_points_around_middle_point'):
+                point_right, point_left = self.path_planner.get_points_around_middle_point(zone_details, target_point, current_bearing, deadline)
             
             preferred_point, alternative_point = self.path_planner.get_preferred_and_alternative_points(preferred_point if preferred_point is not None else self.goal, point_right, point_left)
 
-            print(f"Preferred point: {preferred_point.lat,preferred_point.lon} - Alternative point: {alternative_point.lat,alternative_point.lon}")
+            if Instrumentation.enabled:
+                Instrumentation.event('detour_candidates', iteration=iteration, bearing=current_bearing,
+                                      right=[point_right.lat, point_right.lon], left=[point_left.lat, point_left.lon],
+                                      preferred=[preferred_point.lat, preferred_point.lon],
+                                      alternative=[alternative_point.lat, alternative_point.lon])
             
-            for point in [preferred_point, alternative_point, preferred_point]:
-                path, last_middle_point_index = self.path_planner.generate_complete_path_updated(start, [point] + self.middle_points_list, self.goal)
-                path_clear = self.obstacle_avoidance.path_is_clear_of_red_zones(path)
-                if path_clear:
-                    break
+            # Evaluate both detours at once; keep the first clear one in preference order, else the preferred one
+            candidates = [preferred_point] if alternative_point == preferred_point else [preferred_point, alternative_point]
+            arguments = [start] * len(candidates), candidates, [middle_points_list] * len(candidates)
+            results = self._map(self.evaluate_candidate, *arguments) if parallel_candidates else list(map(self.evaluate_candidate, *arguments))
+            path, last_middle_point_index, path_clear = next((result for result in results if result[2]), results[0])
+            Instrumentation.count('candidate_points', len(candidates))
             
-            self.middle_points_list.append(preferred_point)
-            print(f"Middle points list: {[(point.lat,point.lon) for point in self.middle_points_list]}")
-                
-                
+            middle_points_list.append(preferred_point)
             iteration += 1
-            print("================================")
-        if path_clear:
-            print("Valid path found!")
-            return path
-        
+
+        Instrumentation.event('greedy_result', clear=path_clear, iterations=iteration, vertices=len(path))
+        return path, middle_points_list
+
+    def generate_path_visibility(self, start: Point, deadline: Optional[float] = None) -> Tuple[SparsePath, List[Point]]:
+        vertices = self.graph_planner.plan(start, self.goal, deadline)
+        Instrumentation.event('visibility_result', clear=vertices is not None, vertices=0 if vertices is None else len(vertices))
+        if vertices is None:
+            # No clear path in the graph: fall back to the direct path, and record that it was not searched
+            self.visibility_fallbacks.add(start)
+            return self.path_planner.generate_path_through([start, self.goal]), []
+
+        return self.path_planner.generate_path_through(vertices), vertices[1:-1]
+
+    def plan(self) -> SparsePath:
+        with Instrumentation.timer('plan'):
+            return self._plan()
+
+    def plan_within(self, budget_ms: float) -> PlanResult:
+        """
+        Anytime planning against a deadline.
+
+        The greedy planner runs first (a few milliseconds) to get a usable path early; with time left
+        the visibility-graph search refines it. Every stage checks the deadline between iterations
+        or node expansions, so the overrun is at most one of those steps.
+
+        :param budget_ms: Time budget in milliseconds
+        :return: PlanResult with the shortest valid path found (clear of the zones and inside the
+                 fence), or the greedy result as a fallback
+        """
+        started = time.monotonic()
+        deadline = started + budget_ms / 1000
+        with Instrumentation.timer('plan_within'):
+            greedy = self._plan('greedy', deadline)
+            candidates = [(greedy, self.middle_points_list, self.turn_branches)]
+            searched = False
+            if time.monotonic() < deadline:
+                try:
+                    self.visibility_fallbacks.clear()
+                    visibility = self._plan('visibility', deadline)
+                    candidates.append((visibility, self.middle_points_list, self.turn_branches))
+                    # Only a path the search produced is optimal, not the direct path standing in for none
+                    searched = self.visibility_fallbacks.isdisjoint(visibility.vertices)
+                except TimeoutError:
+                    pass
+
+        valid = [candidate for candidate in candidates if self.obstacle_avoidance.is_path_valid(candidate[0].vertices)]
+        if valid:
+            self.path, self.middle_points_list, self.turn_branches = min(valid, key=lambda candidate: candidate[0].length_km())
+            status = 'optimal' if searched and valid[-1] is candidates[-1] else 'feasible'
         else:
-            print("Could not find a clear path within the maximum number of iterations")
-            return path
+            self.path, self.middle_points_list, self.turn_branches = candidates[0]
+            status = 'fallback'
+        elapsed_ms = (time.monotonic() - started) * 1000
+        Instrumentation.event('plan_within', status=status, budget_ms=budget_ms, elapsed_ms=elapsed_ms)
+        return PlanResult(self.path, status, elapsed_ms)
 
-    def navigate(self) -> Generator[Point, None, None]:
-        path = self.path_planner.generate_waypoints(self.start, self.goal)
-        print(self.current_yaw)
+    def _plan(self, planner: Optional[str] = None, deadline: Optional[float] = None) -> SparsePath:
+        path = self.path_planner.generate_path_through([self.start, self.goal])
+        if Instrumentation.enabled:
+            Instrumentation.event('plan_start', yaw=self.current_yaw, start=[self.start.lat, self.start.lon], goal=[self.goal.lat, self.goal.lon])
         
         adjuster = PathAdjuster()
         right_turn, left_turn, adjusted = adjuster.adjust_initial_path(self.current_yaw, path, self.Max_turn_angle)
         
         if adjusted:
-            right_path = right_turn + self.generate_path(right_turn[-1])
-            left_path = left_turn + self.generate_path(left_turn[-1])
+            # Both turn directions are independent; candidates inside each branch run sequentially
+            # so a branch never waits on the pool it is running in
+            branches = self._map(self.plan_branch, [right_turn[-1], left_turn[-1]], [False, False], [planner] * 2, [deadline] * 2)
+            (right_tail, right_middle), (left_tail, left_middle) = branches
+            right_path = right_turn + right_tail
+            left_path = left_turn + left_tail
 
             # Choose the shortest clear path
-            if len(right_path) < len(left_path) and self.obstacle_avoidance.path_is_clear_of_red_zones(right_path):
+            right_clear = self.obstacle_avoidance.path_is_clear_of_red_zones(right_path.vertices)
+            left_clear = self.obstacle_avoidance.path_is_clear_of_red_zones(left_path.vertices)
+            if right_path.length_km() < left_path.length_km() and right_clear:
                 path = right_path
-            elif self.obstacle_avoidance.path_is_clear_of_red_zones(left_path):
+            elif left_clear:
                 path = left_path
             else:
-                path = right_path if self.obstacle_avoidance.path_is_clear_of_red_zones(right_path) else left_path
+                path = right_path if right_clear else left_path
+            self.middle_points_list = right_middle if path is right_path else left_middle
+            self.turn_branches = right_path, left_path
         else:
-            path = self.generate_path(self.start)
+            path, self.middle_points_list = self.plan_branch(self.start, planner=planner, deadline=deadline)
+            self.turn_branches = None
+
+        self.path = path
+        return path
+
+    def update(self, position: Point, yaw: float, red_zones: Optional[List[RedZone]] = None,
+               time_s: Optional[float] = None) -> SparsePath:
+        """
+        Incrementally replan after the drone moved and/or the red zones changed.
+
+        The part of the current path still ahead of the drone is kept up to the first segment a new
+        or changed zone, or a dynamic zone at the new timing, invalidates; only the route from there to
+        the goal is planned again. Removed zones never invalidate anything, so they only update the
+        zone set. The leg from the drone's position onto the path is always checked in full, since the
+        drone may have drifted off it.
+
+        :param position: Current drone position
+        :param yaw: Current drone yaw in degrees
+        :param red_zones: New complete set of red zones, or None if the zones are unchanged
+        :param time_s: Mission time at position; estimated from the distance flown along the current
+                       path at ground speed when omitted
+        :return: The updated path, also stored in self.path
+        """
+        self.obstacle_avoidance.set_departure(position, self.arrival_time(position) if time_s is None else time_s)
+        changed_zones = self.apply_red_zones(red_zones) if red_zones is not None else []
+        self.start = position
+        self.current_yaw = yaw
+        if self.path is None:
+            return self.plan()
+
+        # Drop everything behind the drone
+        ahead = self.path.vertices[self.path.locate(position) + 1:]
+        remaining = ahead if len(ahead) and ahead[0] == position else [position] + ahead
+
+        if len(remaining) > 1 and not self.obstacle_avoidance.is_path_valid(remaining[:2]):
+            # The leg from the drone onto the path is new whenever the drone drifted off it, so it is
+            # checked against every zone and the fence, not only against the changed zones
+            invalid_segments = np.array([0], dtype=np.intp)
+        else:
+            # Dynamic zones are rechecked even when unchanged: the drone's timing along the path moved
+            zone_columns = np.union1d(np.array([self.obstacle_avoidance.zone_positions[zone.id] for zone in changed_zones], dtype=np.intp),
+                                      self.obstacle_avoidance.dynamic_columns).astype(np.intp)
+            if zone_columns.size:
+                entries = self.obstacle_avoidance.segment_zone_entries(remaining, zone_columns)
+                invalid_segments = np.flatnonzero(~np.isnan(entries).all(axis=1))
+            else:
+                invalid_segments = np.array([], dtype=np.intp)
+
+        if invalid_segments.size == 0:
+            self.path = self.path_planner.generate_path_through(remaining)
+        elif invalid_segments[0] == 0:
+            # The leg the drone is on is blocked, so the heading constraint matters again
+            return self.plan()
+        else:
+            prefix = self.path_planner.generate_path_through(remaining[:invalid_segments[0] + 1])
+            tail, self.middle_points_list = self.plan_branch(prefix[-1])
+            self.path = prefix + tail
+        return self.path
+
+    def _stream_replan(self, position: Point, refinement: Optional['Future']) -> SparsePath:
+        """
+        Replacement for a blocked streaming window, from position (self.start) at self.current_yaw.
+
+        Candidates, cheapest first: the background plan from position (when one runs), full plans
+        with each planner, then a visibility plan that ignores the heading. The first one valid end
+        to end wins. A route with only a clear window is never taken, as it can lead the drone into
+        a dead end and back and forth between replans.
+
+        :raises RuntimeError: When no candidate is valid end to end
+        """
+        replans = [refinement.result] if refinement is not None else []
+        for planner in dict.fromkeys(('greedy', self.planner, 'visibility')):
+            replans.append(lambda planner=planner: (self._plan(planner), self.middle_points_list))
+        replans.append(lambda: self.plan_branch(position, False, 'visibility'))
+
+        for replan in replans:
+            path, middle_points = replan()
+            if self.obstacle_avoidance.is_path_valid(path.vertices):
+                self.middle_points_list = middle_points
+                if Instrumentation.enabled:
+                    Instrumentation.event('stream_replanned', position=[position.lat, position.lon], vertices=len(path))
+                return path
+        if Instrumentation.enabled:
+            Instrumentation.event('stream_blocked', position=[position.lat, position.lon])
+        raise RuntimeError(f"No clear route from ({position.lat}, {position.lon}) to the goal")
+
+    def arrival_time(self, position: Point) -> float:
+        # Mission time on reaching position along the current path, flown from the departure point
+        _, departure_time = self.obstacle_avoidance.departure
+        if self.path is None or len(self.path) < 2:
+            return departure_time
+        flown = GeographicUtils.to_array(self.path.vertices[:self.path.locate(position) + 1] + [position])
+        return departure_time + self.obstacle_avoidance.flight_time_s(float(GeographicUtils.haversine_batch(flown[:-1], flown[1:]).sum()))
+
+    def apply_red_zones(self, red_zones: List[RedZone]) -> List[RedZone]:
+        # Sync the shared ObstacleAvoidance with a new zone set, returning the zones that are new or moved
+        current = {zone.id: zone for zone in self.obstacle_avoidance.red_zones}
+        incoming = {zone.id: zone for zone in red_zones}
+        changed_zones = []
+        for zone_id in current.keys() - incoming.keys():
+            self.obstacle_avoidance.remove_red_zone(zone_id)
+        for zone_id, zone in incoming.items():
+            if zone_id in current and current[zone_id] == zone:
+                continue
+            if zone_id in current:
+                self.obstacle_avoidance.replace_red_zone(zone)
+            else:
+                self.obstacle_avoidance.add_red_zone(zone)
+            changed_zones.append(zone)
+        self.red_zones = list(red_zones)
+        return changed_zones
+
+    def navigate(self) -> Generator[Point, None, None]:
+        path = self.plan()
 
         # Plot paths if adjusted; otherwise, plot the initial path
-        if adjusted:
-            Visualizer.plot_path(right_path, self.red_zones, self.start, self.goal, left_path)
+        if self.turn_branches:
+            right_path, left_path = self.turn_branches
+            self.visualizer.plot_path(right_path, self.red_zones, self.start, self.goal, left_path)
         
         
         
@@ -100,11 +380,79 @@ class DroneNavigator:
         #     print(f"path is not valid: ")
         
         
-        Visualizer.plot_path(path, self.red_zones, self.start, self.goal, self.middle_points_list,self.boundary_points)
+        self.visualizer.plot_path(path, self.red_zones, self.start, self.goal, self.middle_points_list,self.boundary_points)
         
-        print(self.obstacle_avoidance.is_point_valid(self.start))
-        for point in path:
-            yield point
-            
-            
+        if Instrumentation.enabled:
+            Instrumentation.event('navigate', start_valid=self.obstacle_avoidance.is_point_valid(self.start), vertices=len(path))
+        if self.smoother is None:
+            yield from path.densify()
+            return
+        with Instrumentation.timer('smooth'):
+            points, self.sharp_corners = self.smoother.smooth(path.vertices)
+        Instrumentation.event('smoothed', samples=len(points), sharp_corners=self.sharp_corners)
+        yield from points
+
+    def navigate_streaming(self, lookahead_m: float = 100.0, first_budget_ms: float = 20.0) -> Generator[Point, None, None]:
+        """
+        Yield waypoints while the rest of the route is still being planned.
+
+        A deadline-bounded greedy plan gives the first route. Waypoints are then streamed one
+        lookahead window (the route up to lookahead_m ahead, long legs cut there) at a time. No
+        window is yielded before it is confirmed clear of the zones at the drone's timing and
+        inside the fence; a blocked window (a rushed first plan, a zone change) is replaced by the
+        background plan from the drone's position, or by fresh plans without a deadline. Meanwhile
+        the configured planner refines the route from the end of the window on a background thread;
+        the refinement replaces the remaining route when the drone gets there, if it is clear and
+        shorter. Zone sets handed over with submit_red_zones are applied between windows, once no
+        background planning runs.
+
+        :raises RuntimeError: When the window ahead is blocked and no plan from the drone's position
+                              is clear; nothing of that window has been yielded
+        """
+        started = time.monotonic()
+        path = self._plan('greedy', started + first_budget_ms / 1000)
+        position, yaw = self.start, self.current_yaw
+        from concurrent.futures import ThreadPoolExecutor
+
+        refinement: Optional['Future'] = None
+        last_submitted: Optional['Future'] = None
+        first_window = True
+
+        with ThreadPoolExecutor(max_workers=1) as background:
+            while True:
+                red_zones, self._pending_red_zones = self._pending_red_zones, None
+                if red_zones is not None:
+                    if last_submitted is not None:
+                        last_submitted.result()
+                    self.path = path
+                    path = self.update(position, yaw, red_zones)
+                    Instrumentation.event('stream_zones_applied', zones=len(red_zones))
+                elif refinement is not None and refinement.done():
+                    tail, middle_points = refinement.result()
+                    if self.obstacle_avoidance.is_path_valid(tail.vertices) and tail.length_km() < path.length_km():
+                        path, self.middle_points_list = tail, middle_points
+                        Instrumentation.event('stream_refined', vertices=len(tail))
+
+                window, rest = path.split_at_distance(lookahead_m / 1000)
+                # Nothing is flown before its window is confirmed clear and inside the fence (a cache hit
+                # for windows checked before). A blocked window is replaced by the background plan from
+                # here, else by fresh, unbounded plans; if none of them clears it, the stream stops.
+                if not self.obstacle_avoidance.is_path_valid(window.vertices):
+                    path = self._stream_replan(position, refinement)
+                    window, rest = path.split_at_distance(lookahead_m / 1000)
+
+                # Refine from where this window ends, while the drone flies it
+                refinement = background.submit(self.plan_branch, rest[0], False) if len(rest) > 1 else None
+                last_submitted = refinement or last_submitted
+                if first_window:
+                    Instrumentation.event('stream_first_window', latency_ms=(time.monotonic() - started) * 1000, vertices=len(window))
+                    first_window = False
 
+                self.path = path
+                yield from window.densify(include_last=len(rest) <= 1)
+                if len(rest) <= 1:
+                    return
+                yaw = GeographicUtils.calculate_bearing(window[-2], window[-1])
+                position, self.start, self.current_yaw = window[-1], window[-1], yaw
+                self.obstacle_avoidance.set_departure(position, self.obstacle_avoidance.departure[1] + self.obstacle_avoidance.flight_time_s(window.length_km()))
+                path = rest
@@ -1,13 +1,19 @@
 import math
-from typing import Tuple
+from typing import Iterable, Tuple
 
-from Point import Point
+import numpy as np
+
+from Instrumentation import Instrumentation
+from Point import Point, PointArray
 
 
 class GeographicUtils:
     R = 6371  # Radius of the Earth in km
+    METRES_PER_DEGREE = math.radians(1) * R * 1000  # Along a meridian, on the same sphere
     @staticmethod
     def haversine(point1: Point, point2: Point) -> float:
+        if Instrumentation.enabled:
+            Instrumentation.count('haversine')
         R = 6371  # Radius of the Earth in km
         dlat = math.radians(point2.lat - point1.lat)
         dlon = math.radians(point2.lon - point1.lon)
@@ -110,3 +116,78 @@ class GeographicUtils:
         while diff < -180:
             diff += 360
         return diff
+
+    @staticmethod
+    def to_array(points: Iterable[Point]) -> np.ndarray:
+        """
+        Pack points into an (N, 2) float64 array of (lat, lon) rows.
+        
+        :param points: Iterable of points; a PointArray is returned as a view, without copying
+        :return: Array of shape (N, 2) in degrees
+        """
+        if isinstance(points, PointArray):
+            return points.array
+        return np.array([(point.lat, point.lon) for point in points], dtype=np.float64).reshape(-1, 2)
+
+    @staticmethod
+    def haversine_batch(coords1: np.ndarray, coords2: np.ndarray) -> np.ndarray:
+        """
+        Vectorized haversine over arrays of (lat, lon) rows.
+        
+        :param coords1: Array of shape (..., 2) in degrees
+        :param coords2: Array of shape (..., 2) in degrees, broadcastable against coords1
+        :return: Array of distances in km, same semantics as haversine
+        """
+        coords1 = np.asarray(coords1, dtype=np.float64)
+        coords2 = np.asarray(coords2, dtype=np.float64)
+        if Instrumentation.enabled:
+            Instrumentation.count('haversine', np.broadcast(coords1[..., 0], coords2[..., 0]).size)
+        lat1 = np.radians(coords1[..., 0])
+        lat2 = np.radians(coords2[..., 0])
+        dlat = lat2 - lat1
+        dlon = np.radians(coords2[..., 1] - coords1[..., 1])
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        return GeographicUtils.R * c
+
+    @staticmethod
+    def calculate_bearing_batch(coords1: np.ndarray, coords2: np.ndarray) -> np.ndarray:
+        """
+        Vectorized initial bearing from coords1 to coords2.
+        
+        :param coords1: Array of shape (..., 2) in degrees
+        :param coords2: Array of shape (..., 2) in degrees, broadcastable against coords1
+        :return: Array of bearings in degrees within [0, 360)
+        """
+        coords1 = np.asarray(coords1, dtype=np.float64)
+        coords2 = np.asarray(coords2, dtype=np.float64)
+        lat1 = np.radians(coords1[..., 0])
+        lat2 = np.radians(coords2[..., 0])
+        dlon = np.radians(coords2[..., 1] - coords1[..., 1])
+        y = np.sin(dlon) * np.cos(lat2)
+        x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+        return (np.degrees(np.arctan2(y, x)) + 360) % 360
+
+    @staticmethod
+    def point_with_bearing_batch(coords: np.ndarray, distance, bearing) -> np.ndarray:
+        """
+        Vectorized destination point, same semantics as point_with_bearing.
+        
+        :param coords: Array of shape (..., 2) in degrees
+        :param distance: Distance(s) to travel in meters, broadcastable against coords[..., 0]
+        :param bearing: Bearing(s) in degrees, broadcastable against coords[..., 0]
+        :return: Array of shape (..., 2) with the destination (lat, lon) in degrees
+        """
+        R = 6378137  # Radius of the Earth in meters, as in point_with_bearing
+        coords = np.asarray(coords, dtype=np.float64)
+        bearing_rad = np.radians(bearing)
+        angular_distance = np.asarray(distance, dtype=np.float64) / R
+        lat_rad = np.radians(coords[..., 0])
+        lon_rad = np.radians(coords[..., 1])
+
+        new_lat_rad = np.arcsin(np.sin(lat_rad) * np.cos(angular_distance) +
+                                np.cos(lat_rad) * np.sin(angular_distance) * np.cos(bearing_rad))
+        new_lon_rad = lon_rad + np.arctan2(np.sin(bearing_rad) * np.sin(angular_distance) * np.cos(lat_rad),
+                                           np.cos(angular_distance) - np.sin(lat_rad) * np.sin(new_lat_rad))
+
+        return np.stack(np.broadcast_arrays(np.degrees(new_lat_rad), np.degrees(new_lon_rad)), axis=-1)
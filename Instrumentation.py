@@ -0,0 +1,78 @@
+import json
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List
+
+
+class Instrumentation:
+    """
+    Process-wide counters, per-stage timers and structured events for the planning hot paths.
+
+    Off by default: every entry point returns after a single flag check and timer() hands back a
+    shared no-op context, so instrumented code costs next to nothing in production. Hot loops
+    should still guard with `if Instrumentation.enabled:` before building event payloads. When
+    enabled, events go to a bounded ring buffer and can be exported as JSON lines.
+    """
+
+    enabled = False
+    events: deque = deque(maxlen=4096)
+    counters: Dict[str, int] = {}
+    timings: Dict[str, List[float]] = {}  # stage -> [calls, total seconds, max seconds]
+    _disabled_timer = nullcontext()
+
+    @classmethod
+    def enable(cls, capacity: int = 4096) -> None:
+        cls.events = deque(maxlen=capacity)
+        cls.counters = {}
+        cls.timings = {}
+        cls.enabled = True
+
+    @classmethod
+    def disable(cls) -> None:
+        cls.enabled = False
+
+    @classmethod
+    def count(cls, name: str, amount: int = 1) -> None:
+        if cls.enabled:
+            cls.counters[name] = cls.counters.get(name, 0) + amount
+
+    @classmethod
+    def event(cls, name: str, **fields: Any) -> None:
+        if cls.enabled:
+            cls.events.append(dict(fields, event=name, t=time.perf_counter()))
+
+    @classmethod
+    def timer(cls, stage: str):
+        if not cls.enabled:
+            return cls._disabled_timer
+        return cls._timed(stage)
+
+    @classmethod
+    @contextmanager
+    def _timed(cls, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            timing = cls.timings.setdefault(stage, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += elapsed
+            timing[2] = max(timing[2], elapsed)
+
+    @classmethod
+    def summary(cls) -> Dict[str, Any]:
+        return {
+            'counters': dict(cls.counters),
+            'timings_ms': {stage: {'calls': calls, 'total': total * 1000, 'max': longest * 1000}
+                           for stage, (calls, total, longest) in cls.timings.items()},
+        }
+
+    @classmethod
+    def export_jsonl(cls, filename: str) -> None:
+        # One event per line, followed by a closing summary record
+        with open(filename, 'w') as output:
+            for event in cls.events:
+                output.write(json.dumps(event) + '\n')
+            output.write(json.dumps(dict(cls.summary(), event='summary')) + '\n')
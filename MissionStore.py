@@ -0,0 +1,208 @@
+import hashlib
+import os
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from DroneNavigator import DroneNavigator
+from Point import Point,PointArray,PolygonZone,RedZone
+from SparsePath import SparsePath
+from Visualizer import NullVisualizer
+
+
+@dataclass
+class Mission:
+    start: Point
+    goal: Point
+    current_yaw: float
+    red_zones: List[RedZone]
+    boundary_points: List[Point]
+    no_fly_zones: List[PolygonZone] = field(default_factory=list)
+    planner: str = 'greedy'
+    projection: str = 'geodetic'
+    max_iterations: int = 3
+    ground_speed_mps: Optional[float] = None
+
+    def navigator(self, **kwargs) -> DroneNavigator:
+        return DroneNavigator(self.start, self.goal, self.red_zones, self.current_yaw, self.boundary_points,
+                              max_iterations=self.max_iterations, planner=self.planner, projection=self.projection,
+                              no_fly_zones=self.no_fly_zones, ground_speed_mps=self.ground_speed_mps, **kwargs)
+
+
+class MissionStore:
+    """
+    Compact binary mission snapshot that can be memory-mapped.
+
+    Layout (little endian): a fixed HEADER with the counts, start/goal, yaw and planner parameters
+    (ground speed NaN when unset),
+    padded to a multiple of 8 bytes, followed by float64 arrays, so every array starts 8-byte aligned
+    and is a zero-copy view of the mapped file:
+
+    - red zones, shape (zones, 8): id, lat, lon, radius, velocity north, velocity east, active from,
+      active until (infinite for an unbounded window)
+    - boundary points, shape (boundary, 2): lat, lon
+    - no-fly zones, shape (no_fly, 2): id, vertex count
+    - no-fly vertices, shape (vertices, 2): lat, lon, all zones back to back
+
+    Serialization is canonical (same mission, same bytes), so the SHA-256 of the bytes identifies the
+    mission content and changes with any zone, fence or parameter.
+    """
+
+    MAGIC = b'KAMIMSN\x00'
+    VERSION = 2
+    HEADER = struct.Struct('<8sIIIIII6d16s16s')
+    HEADER_SIZE = (HEADER.size + 7) // 8 * 8
+
+    @classmethod
+    def to_bytes(cls, mission: Mission) -> bytes:
+        zones = np.array([(zone.id, zone.center.lat, zone.center.lon, zone.radius, zone.velocity_north_mps,
+                           zone.velocity_east_mps, zone.active_from, zone.active_until) for zone in mission.red_zones],
+                         dtype='<f8').reshape(-1, 8)
+        boundary = np.array([(point.lat, point.lon) for point in mission.boundary_points], dtype='<f8').reshape(-1, 2)
+        no_fly = np.array([(zone.id, len(zone.vertices)) for zone in mission.no_fly_zones], dtype='<f8').reshape(-1, 2)
+        vertices = np.array([(vertex.lat, vertex.lon) for zone in mission.no_fly_zones for vertex in zone.vertices],
+                            dtype='<f8').reshape(-1, 2)
+        header = cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(zones), len(boundary), len(no_fly), len(vertices),
+                                 mission.max_iterations, mission.start.lat, mission.start.lon, mission.goal.lat,
+                                 mission.goal.lon, mission.current_yaw,
+                                 np.nan if mission.ground_speed_mps is None else mission.ground_speed_mps, mission.planner.encode('ascii'),
+                                 mission.projection.encode('ascii'))
+        return header.ljust(cls.HEADER_SIZE, b'\x00') + b''.join(array.tobytes() for array in (zones, boundary, no_fly, vertices))
+
+    @classmethod
+    def content_hash(cls, mission: Mission) -> str:
+        return hashlib.sha256(cls.to_bytes(mission)).hexdigest()
+
+    @classmethod
+    def save(cls, mission: Mission, path: str) -> str:
+        """
+        :return: Content hash of the saved mission
+        """
+        data = cls.to_bytes(mission)
+        # Write next to the target and rename, so a reader never maps a half-written file
+        temporary = f"{path}.tmp{os.getpid()}"
+        with open(temporary, 'wb') as output:
+            output.write(data)
+        os.replace(temporary, path)
+        return hashlib.sha256(data).hexdigest()
+
+    @classmethod
+    def load_arrays(cls, path: str) -> Dict[str, Union[np.ndarray, float, int, str]]:
+        """
+        Map a snapshot without copying it.
+
+        :return: The header fields, plus 'red_zones', 'boundary_points', 'no_fly_zones' and
+                 'no_fly_vertices' as read-only views into the mapped file
+        """
+        with open(path, 'rb') as snapshot:
+            header = snapshot.read(cls.HEADER.size)
+        if len(header) < cls.HEADER.size:
+            raise ValueError(f"{path}: truncated mission header")
+        (magic, version, zone_count, boundary_count, no_fly_count, vertex_count, max_iterations,
+         start_lat, start_lon, goal_lat, goal_lon, yaw, ground_speed, planner, projection) = cls.HEADER.unpack(header)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"{path}: not a version {cls.VERSION} mission snapshot")
+
+        shapes = {'red_zones': (zone_count, 8), 'boundary_points': (boundary_count, 2),
+                  'no_fly_zones': (no_fly_count, 2), 'no_fly_vertices': (vertex_count, 2)}
+        expected = cls.HEADER_SIZE + 8 * sum(rows * columns for rows, columns in shapes.values())
+        if os.path.getsize(path) != expected:
+            raise ValueError(f"{path}: size does not match the header, expected {expected} bytes")
+        body = (np.memmap(path, dtype='<f8', mode='r', offset=cls.HEADER_SIZE)
+                if expected > cls.HEADER_SIZE else np.empty(0, dtype='<f8'))
+
+        arrays = {'max_iterations': max_iterations, 'start': (start_lat, start_lon), 'goal': (goal_lat, goal_lon),
+                  'current_yaw': yaw, 'ground_speed_mps': None if np.isnan(ground_speed) else ground_speed, 'planner': planner.rstrip(b'\x00').decode('ascii'),
+                  'projection': projection.rstrip(b'\x00').decode('ascii')}
+        offset = 0
+        for name, (rows, columns) in shapes.items():
+            arrays[name] = body[offset:offset + rows * columns].reshape(rows, columns)
+            offset += rows * columns
+        return arrays
+
+    @classmethod
+    def load(cls, path: str) -> Mission:
+        arrays = cls.load_arrays(path)
+        vertices = [Point(lat, lon) for lat, lon in arrays['no_fly_vertices'].tolist()]
+        no_fly_zones = []
+        offset = 0
+        for zone_id, count in arrays['no_fly_zones'].tolist():
+            no_fly_zones.append(PolygonZone(int(zone_id), vertices[offset:offset + int(count)]))
+            offset += int(count)
+        return Mission(Point(*arrays['start']), Point(*arrays['goal']), arrays['current_yaw'],
+                       [RedZone(int(zone_id), Point(lat, lon), *rest) for zone_id, lat, lon, *rest in arrays['red_zones'].tolist()],
+                       [Point(lat, lon) for lat, lon in arrays['boundary_points'].tolist()],
+                       no_fly_zones, arrays['planner'], arrays['projection'], arrays['max_iterations'],
+                       arrays['ground_speed_mps'])
+
+
+class PlanCache:
+    """
+    Planned paths on disk, one <content hash>.npy file of (lat, lon) vertices per mission.
+
+    The key is MissionStore.content_hash, so any change to the zones, fence, start/goal, yaw or planner
+    parameters misses and the stale entry is simply never read again. A hit is still revalidated
+    against the mission (endpoints, zone clearance, geofence) before use, and an entry that fails is
+    deleted, so a corrupted file or a planner change can never hand out an invalid path.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, mission: Mission, navigator: DroneNavigator, key: Optional[str] = None) -> Optional[PointArray]:
+        filename = self.path_for(key or MissionStore.content_hash(mission))
+        try:
+            vertices = np.load(filename, mmap_mode='r')
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        obstacle_avoidance = navigator.obstacle_avoidance
+        valid = (vertices.ndim == 2 and vertices.shape[1] == 2 and len(vertices) >= 2
+                 and tuple(vertices[0]) == (mission.start.lat, mission.start.lon)
+                 and tuple(vertices[-1]) == (mission.goal.lat, mission.goal.lon))
+        if valid:
+            path = PointArray.from_array(np.asarray(vertices, dtype=np.float64))
+            valid = obstacle_avoidance.is_path_valid(path)
+        if not valid:
+            os.remove(filename)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, mission: Mission, vertices: PointArray, key: Optional[str] = None) -> str:
+        filename = self.path_for(key or MissionStore.content_hash(mission))
+        temporary = f"{filename}.tmp{os.getpid()}.npy"
+        np.save(temporary, PointArray(vertices).array)
+        os.replace(temporary, filename)
+        return filename
+
+    def plan(self, mission: Mission, **navigator_kwargs) -> SparsePath:
+        """
+        Cached path for the mission, planned and stored on a miss. Only clear paths are stored.
+
+        :param navigator_kwargs: Extra DroneNavigator arguments; visualizer defaults to NullVisualizer
+        """
+        key = MissionStore.content_hash(mission)
+        navigator = mission.navigator(**dict({'visualizer': NullVisualizer}, **navigator_kwargs))
+        vertices = self.get(mission, navigator, key)
+        if vertices is not None:
+            navigator.path = navigator.path_planner.generate_path_through(vertices)
+            return navigator.path
+
+        path = navigator.plan()
+        if navigator.obstacle_avoidance.is_path_valid(path.vertices):
+            self.put(mission, path.vertices, key)
+        return path
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
@@ -1,44 +1,659 @@
-from typing import List, Tuple
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
 from GeographicUtils import GeographicUtils
-from Point import Point,RedZone
+from LocalFrame import LocalFrame
+from Point import Point,PolygonZone,RedZone
+from PolygonGeofence import PolygonGeofence
+from RedZoneIndex import RedZoneIndex
+from SegmentCache import SegmentCache
 
 class ObstacleAvoidance:
-    def __init__(self, red_zones: List[RedZone], boundaries: List[Point]):
-        self.red_zones = red_zones
+    # Polylines longer than this (dense waypoint lists) skip the per-segment verdict cache
+    CACHED_PATH_MAX_SEGMENTS = 64
+    # Per-zone arrays, one row per entry of red_zones in the same order
+    ZONE_ARRAYS = ('zone_centers', 'zone_limits_km', 'zone_enu', 'zone_velocities', 'zone_windows', 'zone_dynamic',
+                   'zone_drift_deg', 'zone_margins_deg')
+
+    def __init__(self, red_zones: List[RedZone], boundaries: List[Point], cache_size: int = 4096,
+                 frame: Optional[LocalFrame] = None, no_fly_zones: Iterable[PolygonZone] = (),
+                 ground_speed_mps: Optional[float] = None):
+        self.red_zones = list(red_zones)
+        # Zones are keyed by id everywhere (index, zone_positions, updates), so ids must be unique
+        duplicates = sorted(zone_id for zone_id, count in Counter(zone.id for zone in self.red_zones).items() if count > 1)
+        if duplicates:
+            raise ValueError(f"Red zone ids must be unique, got duplicates {duplicates}")
         self.boundaries = boundaries
+        # Boundary points are the fence polygon's vertices in order along its boundary (crossed edges raise
+        # ValueError); two points still mean a lat/lon box
+        if len(boundaries) == 2:
+            (lat0, lon0), (lat1, lon1) = GeographicUtils.to_array(boundaries)
+            boundaries = [Point(lat0, lon0), Point(lat0, lon1), Point(lat1, lon1), Point(lat1, lon0)]
+        self.geofence = PolygonGeofence(boundaries)
+        # Polygonal no-fly zones are checked exactly; their enclosing circles are what planners steer around
+        self.no_fly_zones = list(no_fly_zones)
+        self.no_fly_fences = [PolygonGeofence(zone.vertices) for zone in self.no_fly_zones]
+        self.no_fly_circles = [fence.enclosing_zone(zone.id) for zone, fence in zip(self.no_fly_zones, self.no_fly_fences)]
+        # With a frame, segment geometry runs in its flat ENU metres; zone centres are projected once
+        self.frame = frame
+        # Moving or time-windowed zones have no fixed footprint, so only static zones go in the grid
+        self.zone_index = RedZoneIndex(zone for zone in self.red_zones if not zone.is_dynamic)
+        # Mission clock for dynamic zones: the drone is at the departure point at the departure time and
+        # flies at ground_speed_mps. Without a ground speed, dynamic zones are frozen at the departure time.
+        self.ground_speed_mps = ground_speed_mps
+        self.departure: Tuple[Optional[Point], float] = (None, 0.0)
+        # Bumped on every zone change (and clock change, with dynamic zones present); static_version only
+        # on zone changes and is part of the clearance cache key, so stale verdicts are never hit
+        self.version = 0
+        self.static_version = 0
+        self.clearance_cache = SegmentCache(cache_size)
+        self._rebuild_zone_arrays()
+
+    def _zone_rows(self, zones: List[RedZone]) -> Dict[str, np.ndarray]:
+        centers = GeographicUtils.to_array(zone.center for zone in zones)
+        limits_km = np.array([RedZoneIndex.inflated_radius(zone) / 1000 for zone in zones], dtype=np.float64)
+        # Velocities as (east, north) m/s and active windows as (from, until) s, for the space-time checks
+        velocities = np.array([(zone.velocity_east_mps, zone.velocity_north_mps) for zone in zones], dtype=np.float64).reshape(-1, 2)
+        # The same in degrees: drift per second and inflated radius, both as (lat, lon)
+        lat_deg, lon_deg = self._degrees_per_metre(centers[:, 0])
+        return {
+            'zone_centers': centers,
+            'zone_limits_km': limits_km,
+            # With a frame, zone centres are projected once; unused (and empty) without one
+            'zone_enu': self.frame.to_enu(centers) if self.frame is not None else np.empty((len(zones), 2)),
+            'zone_velocities': velocities,
+            'zone_windows': np.array([(zone.active_from, zone.active_until) for zone in zones], dtype=np.float64).reshape(-1, 2),
+            'zone_dynamic': np.array([zone.is_dynamic for zone in zones], dtype=bool),
+            'zone_drift_deg': np.stack([velocities[:, 1] * lat_deg, velocities[:, 0] * lon_deg], axis=1),
+            'zone_margins_deg': np.stack([lat_deg, lon_deg], axis=1) * (limits_km * 1000)[:, np.newaxis],
+        }
+
+    def _rebuild_zone_arrays(self) -> None:
+        for name, rows in self._zone_rows(self.red_zones).items():
+            setattr(self, name, rows)
+        self.zone_positions = {zone.id: position for position, zone in enumerate(self.red_zones)}
+        self.dynamic_columns = np.flatnonzero(self.zone_dynamic)
+
+    def set_departure(self, point: Point, time_s: float = 0.0) -> None:
+        """
+        Anchor the mission clock: the drone is at point at time_s (seconds).
+
+        Paths are timed from here. A path that starts elsewhere is assumed to start at the earliest
+        time the drone could get there, i.e. after a straight flight from the departure point.
+        """
+        self.departure = (point, time_s)
+        if self.dynamic_columns.size:
+            # Verdicts (and planner graphs) against dynamic zones depend on the clock
+            self.version += 1
+
+    def departure_times(self, coords: np.ndarray) -> np.ndarray:
+        # Earliest arrival at each (lat, lon) row when flying straight from the departure point
+        point, time_s = self.departure
+        if point is None or not self.ground_speed_mps:
+            return np.full(len(coords), time_s)
+        return time_s + GeographicUtils.haversine_batch(coords, (point.lat, point.lon)) * 1000 / self.ground_speed_mps
+
+    def path_times(self, coords: np.ndarray) -> np.ndarray:
+        # Arrival time at every vertex when the polyline is flown from its first vertex without stopping
+        start_time = self.departure_times(coords[:1])[0]
+        if not self.ground_speed_mps:
+            return np.full(len(coords), start_time)
+        legs_s = GeographicUtils.haversine_batch(coords[:-1], coords[1:]) * 1000 / self.ground_speed_mps
+        return start_time + np.concatenate([[0.0], np.cumsum(legs_s)])
+
+    def flight_time_s(self, distance_km: float) -> float:
+        return distance_km * 1000 / self.ground_speed_mps if self.ground_speed_mps else 0.0
+
+    def zone_centers_at(self, zone_columns: np.ndarray, time_s) -> np.ndarray:
+        # (lat, lon) rows of the given zones' centres at time_s (a scalar or one time per zone)
+        return self.zone_centers[zone_columns] + self.zone_drift_deg[zone_columns] * np.reshape(time_s, (-1, 1))
+
+    def zone_at(self, zone: RedZone, time_s: float) -> RedZone:
+        # Static snapshot of a zone where it is at time_s
+        if not zone.is_dynamic:
+            return zone
+        lat_deg, lon_deg = self._degrees_per_metre(zone.center.lat)
+        return RedZone(zone.id, Point(zone.center.lat + zone.velocity_north_mps * time_s * lat_deg,
+                                      zone.center.lon + zone.velocity_east_mps * time_s * lon_deg), zone.radius)
+
+    @staticmethod
+    def _degrees_per_metre(lat) -> Tuple[np.ndarray, np.ndarray]:
+        # Flat-earth scale at the given latitude(s), on the sphere segment_entries measures metres on
+        lat = np.asarray(lat, dtype=np.float64)
+        return (np.full(lat.shape, 1 / GeographicUtils.METRES_PER_DEGREE),
+                1 / (GeographicUtils.METRES_PER_DEGREE * np.cos(np.radians(lat))))
+
+    def add_red_zone(self, zone: RedZone) -> None:
+        """
+        Add one zone, appending its rows to the zone arrays instead of rebuilding them.
+
+        :raises ValueError: If a zone with the same id is already present
+        """
+        if zone.id in self.zone_positions:
+            raise ValueError(f"Red zone id {zone.id} is already in use; zone ids must be unique")
+        if not zone.is_dynamic:
+            self.zone_index.insert(zone)
+        self.zone_positions[zone.id] = len(self.red_zones)
+        self.red_zones.append(zone)
+        for name, rows in self._zone_rows([zone]).items():
+            setattr(self, name, np.concatenate([getattr(self, name), rows]))
+        self._zones_changed()
+
+    def remove_red_zone(self, zone_id: int) -> RedZone:
+        """
+        Remove one zone. The last zone moves into the freed row (swap-remove), so no other row shifts.
+
+        :raises KeyError: If no zone has this id
+        """
+        position = self.zone_positions.pop(zone_id)
+        zone = self.red_zones[position]
+        if not zone.is_dynamic:
+            self.zone_index.remove(zone_id)
+        last = self.red_zones.pop()
+        if position < len(self.red_zones):
+            self.red_zones[position] = last
+            self.zone_positions[last.id] = position
+        for name in self.ZONE_ARRAYS:
+            # Copy rather than write into the old arrays, which callers may still hold
+            array = getattr(self, name)
+            rows = array[:-1].copy()
+            if position < len(rows):
+                rows[position] = array[-1]
+            setattr(self, name, rows)
+        self._zones_changed()
+        return zone
+
+    def replace_red_zone(self, zone: RedZone) -> RedZone:
+        """
+        Swap in a new version of an existing zone (same id, e.g. moved or resized), rewriting its row only.
+
+        :return: The zone it replaces
+        :raises KeyError: If no zone has this id
+        """
+        position = self.zone_positions[zone.id]
+        previous = self.red_zones[position]
+        if not previous.is_dynamic:
+            self.zone_index.remove(zone.id)
+        if not zone.is_dynamic:
+            self.zone_index.insert(zone)
+        self.red_zones[position] = zone
+        for name, rows in self._zone_rows([zone]).items():
+            array = getattr(self, name).copy()
+            array[position] = rows[0]
+            setattr(self, name, array)
+        self._zones_changed()
+        return previous
+
+    def _zones_changed(self) -> None:
+        self.dynamic_columns = np.flatnonzero(self.zone_dynamic)
+        self.version += 1
+        self.static_version += 1
 
     def is_point_in_red_zone(self, point: Point) -> bool:
-        for zone in self.red_zones:
+        for zone in self.zone_index.query_point(point):
             if GeographicUtils.haversine(point, zone.center) <= (zone.radius + (zone.radius / 6)) / 1000:
                 return True
-        return False
+        if self.dynamic_columns.size:
+            columns = self.dynamic_columns
+            time_s = float(self.departure_times(np.array([[point.lat, point.lon]]))[0])
+            active = (self.zone_windows[columns, 0] <= time_s) & (time_s <= self.zone_windows[columns, 1])
+            distances = GeographicUtils.haversine_batch(self.zone_centers_at(columns, time_s), (point.lat, point.lon))
+            if (active & (distances <= self.zone_limits_km[columns])).any():
+                return True
+        return any(fence.contains_point(point) for fence in self.no_fly_fences)
+
+    def candidate_zone_columns(self, path: List[Point], times: Optional[np.ndarray] = None) -> np.ndarray:
+        # Positions in red_zones of the zones that can't be ruled out for this path, in list order
+        columns = self._static_candidates(path)
+        if self.dynamic_columns.size:
+            coords = GeographicUtils.to_array(path)
+            columns = np.sort(np.concatenate([columns, self._dynamic_candidates(coords, self.path_times(coords) if times is None else times)]))
+        return columns
+
+    def _static_candidates(self, path: List[Point]) -> np.ndarray:
+        return np.array(sorted(self.zone_positions[zone.id] for zone in self.zone_index.query_path(path)), dtype=np.intp)
+
+    def _dynamic_candidates(self, coords: np.ndarray, times: np.ndarray) -> np.ndarray:
+        # Interval pruning: a dynamic zone matters only if it is active while the path is flown and the
+        # box it sweeps over that interval overlaps the path's bounding box
+        columns = self.dynamic_columns
+        first = np.maximum(self.zone_windows[columns, 0], times[0])
+        last = np.minimum(self.zone_windows[columns, 1], times[-1])
+        live = first <= last
+        columns, first, last = columns[live], first[live], last[live]
+        first_centers, last_centers = self.zone_centers_at(columns, first), self.zone_centers_at(columns, last)
+        low = np.minimum(first_centers, last_centers) - self.zone_margins_deg[columns]
+        high = np.maximum(first_centers, last_centers) + self.zone_margins_deg[columns]
+        near = (high >= coords.min(axis=0)).all(axis=1) & (low <= coords.max(axis=0)).all(axis=1)
+        return columns[near]
+
+    def segment_zone_entries(self, path: List[Point], zone_columns: np.ndarray = None) -> np.ndarray:
+        """
+        Closed-form clearance of every path segment against every inflated zone circle.
+
+        :param path: Polyline vertices; a single point is treated as a zero-length segment
+        :param zone_columns: Positions in red_zones to test; all zones when omitted
+        :return: (segments x zones) array with the entry parameter t in [0, 1] along each
+                 segment, or NaN where the segment does not touch the zone
+        """
+        coords = GeographicUtils.to_array(path)
+        if len(coords) == 1:
+            coords = np.vstack([coords, coords])
+        start_times = self.path_times(coords)[:-1] if self.dynamic_columns.size else None
+        return self.segment_entries(coords[:-1], coords[1:], zone_columns, start_times)
+
+    def segment_entries(self, starts: np.ndarray, ends: np.ndarray, zone_columns: np.ndarray = None,
+                        start_times: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Closed-form clearance of independent segments against the inflated zone circles.
+
+        Each segment is expressed in gnomonic metres, either in the mission's LocalFrame or, without one,
+        in a LocalFrame at its own start point, and intersected with the zone circle by solving
+        |A + t(B - A) - C|^2 = r^2 for t. Either way the segment is exactly the great-circle leg; only the
+        zone circle is distorted, by a relative error below (d/R)^2 for a zone d from the frame origin,
+        so an entry is missed by a few millimetres at most on a 30 km leg. Dynamic zones are checked in
+        space-time, see _moving_entries.
+
+        :param starts: (M, 2) array of segment start (lat, lon) rows
+        :param ends: (M, 2) array of segment end (lat, lon) rows
+        :param zone_columns: Positions in red_zones to test; all zones when omitted
+        :param start_times: (M,) mission times at the segment starts; the earliest possible arrival when omitted
+        :return: (M x zones) array with the entry parameter t in [0, 1], or NaN where the segment misses the zone
+        """
+        if zone_columns is None:
+            zone_columns = np.arange(len(self.red_zones))
+
+        if self.frame is not None:
+            starts_enu = self.frame.to_enu(starts)
+            delta = self.frame.to_enu(ends) - starts_enu
+            d_x, d_y = delta[:, 0:1], delta[:, 1:2]
+            offset = starts_enu[:, np.newaxis, :] - self.zone_enu[zone_columns][np.newaxis, :, :]
+            f_x, f_y = offset[..., 0], offset[..., 1]
+        else:
+            # Each start is the origin of its own frame, so it maps to (0, 0)
+            delta = LocalFrame.enu_about(starts, ends)
+            d_x, d_y = delta[:, 0:1], delta[:, 1:2]
+            offset = -LocalFrame.enu_about(starts, self.zone_centers[zone_columns], shared=True)
+            f_x, f_y = offset[..., 0], offset[..., 1]
+        radius_m = self.zone_limits_km[zone_columns] * 1000
+
+        moving = self.zone_dynamic[zone_columns]
+        if moving.any() and len(starts):
+            if start_times is None:
+                start_times = self.departure_times(starts)
+            if moving.all():
+                return self._moving_entries(d_x, d_y, f_x, f_y, radius_m, zone_columns, start_times)
+            entries = self._circle_entries(d_x, d_y, f_x, f_y, radius_m)
+            entries[:, moving] = self._moving_entries(d_x, d_y, f_x[:, moving], f_y[:, moving], radius_m[moving],
+                                                      zone_columns[moving], start_times)
+            return entries
+        return self._circle_entries(d_x, d_y, f_x, f_y, radius_m)
+
+    @staticmethod
+    def _circle_entries(d_x: np.ndarray, d_y: np.ndarray, f_x: np.ndarray, f_y: np.ndarray, radius_m: np.ndarray) -> np.ndarray:
+        a = d_x ** 2 + d_y ** 2
+        b = 2 * (f_x * d_x + f_y * d_y)
+        c = f_x ** 2 + f_y ** 2 - radius_m ** 2
+        discriminant = b ** 2 - 4 * a * c
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (-b - np.sqrt(discriminant)) / (2 * a)
+        crosses = (a > 0) & (discriminant >= 0) & (t >= 0) & (t <= 1)
+        return np.where(c <= 0, 0.0, np.where(crosses, t, np.nan))
+
+    def _moving_entries(self, d_x: np.ndarray, d_y: np.ndarray, f_x: np.ndarray, f_y: np.ndarray, radius_m: np.ndarray,
+                        zone_columns: np.ndarray, start_times: np.ndarray) -> np.ndarray:
+        """
+        Exact space-time clearance against moving, time-windowed zones.
+
+        Relative to a zone moving at constant velocity V, a segment flown from time ts over duration T
+        is again a straight segment, D(u) = (A - C(ts)) + u((B - A) - V T) for u in [0, 1], so the
+        conflict test is the same quadratic as for static zones, restricted to the part of [0, 1]
+        where the zone is active.
+
+        :param d_x: (M, 1) segment east extent in metres; d_y likewise north
+        :param f_x: (M, K) segment start minus zone centre at time 0, east, in metres; f_y likewise north
+        :param radius_m: (K,) inflated radii
+        :param zone_columns: (K,) positions in red_zones
+        :param start_times: (M,) mission times at the segment starts
+        :return: (M x K) entry parameters u, or NaN where the segment stays clear
+        """
+        v_x, v_y = self.zone_velocities[zone_columns, 0], self.zone_velocities[zone_columns, 1]
+        windows = self.zone_windows[zone_columns]
+        times = np.asarray(start_times, dtype=np.float64)[:, np.newaxis]
+        duration = np.sqrt(d_x ** 2 + d_y ** 2) / self.ground_speed_mps if self.ground_speed_mps else np.zeros_like(d_x)
+
+        f_x, f_y = f_x - v_x * times, f_y - v_y * times
+        r_x, r_y = d_x - v_x * duration, d_y - v_y * duration
+        if np.isinf(windows).all():
+            # Always active: the whole segment counts
+            low, high = np.zeros_like(f_x), np.ones_like(f_x)
+        else:
+            # Active part of the segment; a segment flown in no time is active as a whole or not at all
+            with np.errstate(divide='ignore', invalid='ignore'):
+                low = np.where(duration > 0, (windows[:, 0] - times) / duration, np.where(windows[:, 0] <= times, 0.0, np.inf))
+                high = np.where(duration > 0, (windows[:, 1] - times) / duration, np.where(windows[:, 1] >= times, 1.0, -np.inf))
+            low, high = np.maximum(low, 0.0), np.minimum(high, 1.0)
+            active = low <= high
+            low = np.where(active, low, 0.0)
+            high = np.where(active, high, -1.0)
+
+        a = r_x ** 2 + r_y ** 2
+        b = 2 * (f_x * r_x + f_y * r_y)
+        c = f_x ** 2 + f_y ** 2 - radius_m ** 2
+        discriminant = b ** 2 - 4 * a * c
+        with np.errstate(divide='ignore', invalid='ignore'):
+            u = (-b - np.sqrt(discriminant)) / (2 * a)
+        inside_at_low = (a * low ** 2 + b * low + c <= 0) & (low <= high)
+        crosses = (a > 0) & (discriminant >= 0) & (u >= low) & (u <= high)
+        return np.where(inside_at_low, low, np.where(crosses, u, np.nan))
+
+    def segments_are_clear_of_red_zones(self, starts: np.ndarray, ends: np.ndarray,
+                                        start_times: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Vectorized clearance verdict for many independent segments at once.
+
+        :param starts: (M, 2) array of segment start (lat, lon) rows
+        :param ends: (M, 2) array of segment end (lat, lon) rows
+        :param start_times: (M,) mission times at the segment starts, only used for dynamic zones
+        :return: Boolean array of shape (M,), True where the segment is clear of every red zone
+        """
+        if not self.red_zones or len(starts) == 0:
+            return self.segments_are_clear_of_no_fly_zones(starts, ends)
+        return np.isnan(self.segment_entries(starts, ends, start_times=start_times)).all(axis=1) & self.segments_are_clear_of_no_fly_zones(starts, ends)
+
+    def segments_are_clear_of_no_fly_zones(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        clear = np.ones(len(starts), dtype=bool)
+        for fence in self.no_fly_fences:
+            clear &= ~self._segments_touching(fence, starts, ends)
+        return clear
+
+    @staticmethod
+    def _segments_touching(fence: PolygonGeofence, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        # Bounding-box reject before the exact polygon test
+        near = ((np.maximum(starts[:, 0], ends[:, 0]) >= fence.min_lat) & (np.minimum(starts[:, 0], ends[:, 0]) <= fence.max_lat) &
+                (np.maximum(starts[:, 1], ends[:, 1]) >= fence.min_lon) & (np.minimum(starts[:, 1], ends[:, 1]) <= fence.max_lon))
+        touching = np.zeros(len(starts), dtype=bool)
+        rows = np.flatnonzero(near)
+        if rows.size:
+            touching[rows] = fence.segments_intersect(starts[rows], ends[rows])
+        return touching
+
+    def segments_are_valid(self, starts: np.ndarray, ends: np.ndarray, start_times: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Vectorized full validity: clear of every red and no-fly zone and inside the geofence.
+
+        :param starts: (M, 2) array of segment start (lat, lon) rows
+        :param ends: (M, 2) array of segment end (lat, lon) rows
+        :param start_times: (M,) mission times at the segment starts, only used for dynamic zones
+        :return: Boolean array of shape (M,)
+        """
+        valid = self.geofence.segments_inside(starts, ends)
+        rows = np.flatnonzero(valid)
+        valid[rows] = self.segments_are_clear_of_red_zones(starts[rows], ends[rows],
+                                                           None if start_times is None else np.asarray(start_times)[rows])
+        return valid
+
+    def fan_is_valid(self, origin: np.ndarray, ends: np.ndarray, start_time: Optional[float] = None) -> np.ndarray:
+        """
+        segments_are_valid for a fan of segments that all start at origin, without the segments x zones matrix.
+
+        Seen from origin, a static zone circle at distance D with radius r can only be entered by a segment
+        whose bearing is within asin(r / D) of the zone's and which is at least D - r long. With the ends
+        sorted by bearing each zone's candidates are one searchsorted range, and the exact quadratic only
+        runs for those (segment, zone) pairs, so the cost follows the pairs that can actually collide.
+        Dynamic zones are few and time dependent; they get the full check.
+
+        :param origin: (lat, lon) shared by every segment
+        :param ends: (M, 2) array of segment end (lat, lon) rows
+        :param start_time: Mission time at origin, only used for dynamic zones
+        :return: Boolean array of shape (M,)
+        """
+        starts = np.broadcast_to(origin, ends.shape)
+        valid = self.geofence.segments_inside(starts, ends)
+        rows = np.flatnonzero(valid)
+        valid[rows] = self.segments_are_clear_of_no_fly_zones(starts[rows], ends[rows])
+        rows = rows[valid[rows]]
+        static = np.flatnonzero(~self.zone_dynamic)
+        if rows.size and self.dynamic_columns.size:
+            valid[rows] = np.isnan(self.segment_entries(starts[rows], ends[rows], self.dynamic_columns,
+                                                        None if start_time is None else np.full(len(rows), start_time))).all(axis=1)
+            rows = rows[valid[rows]]
+        if rows.size == 0 or static.size == 0:
+            return valid
+
+        # Same metres as segment_entries: the frame, or a LocalFrame at the shared start
+        if self.frame is not None:
+            origin_enu = self.frame.to_enu(origin)
+            delta = self.frame.to_enu(ends[rows]) - origin_enu
+            offset = origin_enu - self.zone_enu[static]
+        else:
+            delta = LocalFrame.enu_about(starts[rows], ends[rows])
+            offset = -LocalFrame.enu_about(starts[:1], self.zone_centers[static], shared=True)[0]
+        radius_m = self.zone_limits_km[static] * 1000
+        distance = np.hypot(offset[:, 0], offset[:, 1])
+        if (distance <= radius_m).any():
+            # Origin inside a zone: every segment enters it at t = 0
+            valid[rows] = False
+            return valid
+
+        bearings = np.arctan2(delta[:, 1], delta[:, 0])
+        order = np.argsort(bearings)
+        # Bearings twice around the circle, so a zone's range never has to wrap
+        circle = np.concatenate([bearings[order], bearings[order] + 2 * np.pi])
+        half_width = np.arcsin(radius_m / distance) + 1e-9
+        low = np.mod(np.arctan2(-offset[:, 1], -offset[:, 0]) - half_width + np.pi, 2 * np.pi) - np.pi
+        first = np.searchsorted(circle, low, side='left')
+        counts = np.minimum(np.searchsorted(circle, low + 2 * half_width, side='right') - first, len(order))
+        pair_zones = np.repeat(np.arange(len(static)), counts)
+        pair_segments = order[(np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())) % len(order)]
+        lengths = np.hypot(delta[:, 0], delta[:, 1])
+        reach = lengths[pair_segments] >= distance[pair_zones] - radius_m[pair_zones] - 1e-6
+        pair_zones, pair_segments = pair_zones[reach], pair_segments[reach]
+
+        entries = self._circle_entries(delta[pair_segments, 0], delta[pair_segments, 1], offset[pair_zones, 0],
+                                       offset[pair_zones, 1], radius_m[pair_zones])
+        blocked = np.zeros(len(rows), dtype=bool)
+        blocked[pair_segments[~np.isnan(entries)]] = True
+        valid[rows] = ~blocked
+        return valid
+
+    def leg_near_intervals(self, start: Point, goal: Point, margin_m: float) -> np.ndarray:
+        """
+        Stretches of a leg that come within margin_m of an inflated zone, a no-fly polygon or the fence.
+
+        Closed form in flat metres (the mission's LocalFrame, or one at start like segment_entries):
+        each zone is its inflated circle grown by margin_m, and each fence or no-fly edge a capsule of
+        radius margin_m, i.e. two end circles and a strip. Both are convex, so each yields one interval of
+        the leg parameter. A dynamic zone that can't be ruled out for the leg marks the whole leg as near.
+
+        :return: (K, 2) array of sorted, disjoint [from, to] leg fractions within [0, 1]
+        """
+        coords = np.array([[start.lat, start.lon], [goal.lat, goal.lon]])
+        if self.dynamic_columns.size and self._dynamic_candidates(coords, self.path_times(coords)).size:
+            return np.array([[0.0, 1.0]])
+        edges = np.vstack([self.geofence.edges] + [fence.edges for fence in self.no_fly_fences])
+        if self.frame is not None:
+            to_metres = lambda rows: self.frame.to_enu(rows) - self.frame.to_enu(coords[:1])
+        else:
+            to_metres = lambda rows: LocalFrame.enu_about(coords[:1], rows, shared=True)[0]
+        direction = to_metres(coords[1:])[0]
+        length_sq = float(direction @ direction)
+        if length_sq == 0:
+            return np.empty((0, 2))
+
+        static = ~self.zone_dynamic
+        circle_centers = np.vstack([to_metres(self.zone_centers[static]), to_metres(edges[:, 0:2]), to_metres(edges[:, 2:4])])
+        circle_radii = np.concatenate([self.zone_limits_km[static] * 1000 + margin_m, np.full(2 * len(edges), margin_m)])
+        projection = circle_centers @ direction
+        discriminant = projection ** 2 - length_sq * (np.sum(circle_centers ** 2, axis=1) - circle_radii ** 2)
+        root = np.sqrt(np.maximum(discriminant, 0))
+        hit = discriminant >= 0
+        # Empty intervals are (inf, -inf), so they drop out of the min/max hulls below
+        low = np.where(hit, (projection - root) / length_sq, np.inf)
+        high = np.where(hit, (projection + root) / length_sq, -np.inf)
+
+        zones = int(static.sum())
+        edge_starts, edge_ends = circle_centers[zones:zones + len(edges)], circle_centers[zones + len(edges):]
+        along = edge_ends - edge_starts
+        edge_lengths = np.hypot(along[:, 0], along[:, 1])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            along /= edge_lengths[:, np.newaxis]
+        across = np.stack([-along[:, 1], along[:, 0]], axis=1)
+        strip_low, strip_high = self._linear_interval(-np.sum(edge_starts * along, axis=1), along @ direction, 0, edge_lengths)
+        side_low, side_high = self._linear_interval(-np.sum(edge_starts * across, axis=1), across @ direction, -margin_m, margin_m)
+        strip_low, strip_high = np.maximum(strip_low, side_low), np.minimum(strip_high, side_high)
+        strip_low, strip_high = np.where(strip_low <= strip_high, strip_low, np.inf), np.where(strip_low <= strip_high, strip_high, -np.inf)
+        strip_low[edge_lengths == 0], strip_high[edge_lengths == 0] = np.inf, -np.inf
+
+        intervals = np.vstack([
+            np.stack([low[:zones], high[:zones]], axis=1),
+            np.stack([np.minimum.reduce([low[zones:zones + len(edges)], low[zones + len(edges):], strip_low]),
+                      np.maximum.reduce([high[zones:zones + len(edges)], high[zones + len(edges):], strip_high])], axis=1)])
+        intervals = np.clip(intervals, 0, 1)[(intervals[:, 0] <= 1) & (intervals[:, 1] >= 0) & (intervals[:, 0] <= intervals[:, 1])]
+        merged = []
+        for low_t, high_t in intervals[np.argsort(intervals[:, 0])].tolist():
+            if merged and low_t <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], high_t)
+            else:
+                merged.append([low_t, high_t])
+        return np.array(merged).reshape(-1, 2)
+
+    @staticmethod
+    def _linear_interval(offset: np.ndarray, slope: np.ndarray, low, high) -> Tuple[np.ndarray, np.ndarray]:
+        # Parameters t where low <= offset + slope * t <= high; (inf, -inf) when there are none
+        with np.errstate(divide='ignore', invalid='ignore'):
+            first, second = (low - offset) / slope, (high - offset) / slope
+        flat_inside = (low <= offset) & (offset <= high)
+        start = np.where(slope > 0, first, second)
+        end = np.where(slope > 0, second, first)
+        start = np.where(slope == 0, np.where(flat_inside, -np.inf, np.inf), start)
+        end = np.where(slope == 0, np.where(flat_inside, np.inf, -np.inf), end)
+        return start, end
+
+    def find_first_red_zone_segment(self, path: List[Point]) -> Tuple[int, RedZone, Point]:
+        """
+        Find the first path segment that enters an inflated red zone or a no-fly polygon.
+
+        :param path: Polyline vertices
+        :return: Tuple of (segment index, zone, entry point), or (None, None, None) if the path is clear.
+                 For a no-fly polygon the zone is its enclosing circle; a dynamic zone is returned
+                 where it is when the path enters it.
+        """
+        if len(path) == 0 or not (self.red_zones or self.no_fly_zones):
+            return None, None, None
+        coords = GeographicUtils.to_array(path)
+        if len(coords) == 1:
+            coords = np.vstack([coords, coords])
+        hits = []  # (segment index, t, zone, planar) per zone kind
+
+        times = self.path_times(coords) if self.dynamic_columns.size else None
+        zone_columns = self.candidate_zone_columns(path, times) if self.red_zones else np.empty(0, dtype=np.intp)
+        if zone_columns.size:
+            entries = self.segment_entries(coords[:-1], coords[1:], zone_columns, None if times is None else times[:-1])
+            hit_rows = np.flatnonzero(~np.isnan(entries).all(axis=1))
+            if hit_rows.size:
+                segment_index = int(hit_rows[0])
+                zone_index = int(np.nanargmin(entries[segment_index]))
+                t = float(entries[segment_index, zone_index])
+                zone = self.red_zones[zone_columns[zone_index]]
+                if zone.is_dynamic:
+                    zone = self.zone_at(zone, times[segment_index] + t * (times[segment_index + 1] - times[segment_index]))
+                hits.append((segment_index, t, zone, False))
+
+        for fence, circle in zip(self.no_fly_fences, self.no_fly_circles):
+            hit_rows = np.flatnonzero(self._segments_touching(fence, coords[:-1], coords[1:]))
+            if hit_rows.size:
+                segment_index = int(hit_rows[0])
+                t = fence.entry_fraction(Point(*coords[segment_index]), Point(*coords[segment_index + 1]))
+                hits.append((segment_index, t, circle, True))
+
+        if not hits:
+            return None, None, None
+        segment_index, t, zone, planar = min(hits, key=lambda hit: hit[:2])
+        start, end = coords[segment_index], coords[segment_index + 1]
+        if planar:
+            entry = start + t * (end - start)
+        else:
+            # t is along the segment in the frame it was found in: the mission's, or one at its start
+            frame = self.frame or LocalFrame(Point(float(start[0]), float(start[1])))
+            start_enu, end_enu = frame.to_enu(np.array([start, end]))
+            entry = frame.to_geodetic(start_enu + t * (end_enu - start_enu))
+        return segment_index, zone, Point(float(entry[0]), float(entry[1]))
 
     def path_is_clear_of_red_zones(self, path: List[Point]) -> bool:
-        for point in path:
-            if self.is_point_in_red_zone(point):
+        if len(path) == 0 or not (self.red_zones or self.no_fly_zones):
+            return True
+        coords = GeographicUtils.to_array(path)
+        if len(coords) == 1:
+            coords = np.vstack([coords, coords])
+        if self.dynamic_columns.size:
+            # Verdicts against dynamic zones depend on when the segment is flown, so they are never cached
+            times = self.path_times(coords)
+            zone_columns = self._dynamic_candidates(coords, times)
+            if zone_columns.size and not np.isnan(self.segment_entries(coords[:-1], coords[1:], zone_columns, times[:-1])).all():
+                return False
+        if len(coords) - 1 > self.CACHED_PATH_MAX_SEGMENTS:
+            zone_columns = self._static_candidates(path)
+            if zone_columns.size and not np.isnan(self.segment_entries(coords[:-1], coords[1:], zone_columns)).all():
                 return False
-        return True
-    
+            return bool(self.segments_are_clear_of_no_fly_zones(coords[:-1], coords[1:]).all())
+
+        # Cached verdicts cover the static zones and no-fly polygons only
+        keys = self.clearance_cache.segment_keys(coords, self.static_version)
+        verdicts = [self.clearance_cache.get(key) for key in keys]
+        if False in verdicts:
+            return False
+
+        missing = np.array([index for index, verdict in enumerate(verdicts) if verdict is None], dtype=np.intp)
+        if missing.size == 0:
+            return True
+        zone_columns = self._static_candidates(path)
+        if zone_columns.size == 0:
+            computed = np.ones(missing.size, dtype=bool)
+        else:
+            computed = np.isnan(self.segment_entries(coords[missing], coords[missing + 1], zone_columns)).all(axis=1)
+        computed &= self.segments_are_clear_of_no_fly_zones(coords[missing], coords[missing + 1])
+        for index, verdict in zip(missing, computed):
+            self.clearance_cache.put(keys[index], bool(verdict))
+        return bool(computed.all())
+
     def find_first_red_zone_point(self, path: List[Point]) -> Tuple[Point, RedZone]:
-        for point in path:
-            for zone in self.red_zones:
-                if GeographicUtils.haversine(point, zone.center) <= (zone.radius + (zone.radius / 6)) / 1000:
-                    return point, zone
-        return None, None
-    
+        _, zone, entry_point = self.find_first_red_zone_segment(path)
+        return entry_point, zone
+
     def is_point_in_boundaries(self, point: Point) -> bool:
-        min_lat = min(boundary.lat for boundary in self.boundaries)
-        max_lat = max(boundary.lat for boundary in self.boundaries)
-        min_lon = min(boundary.lon for boundary in self.boundaries)
-        max_lon = max(boundary.lon for boundary in self.boundaries)
-        
-        return min_lat <= point.lat <= max_lat and min_lon <= point.lon <= max_lon
-    
+        return self.geofence.contains_point(point)
+
     def is_point_valid(self, point: Point) -> bool:
         return not self.is_point_in_red_zone(point) and self.is_point_in_boundaries(point)
 
+    def points_are_valid(self, coords: np.ndarray) -> np.ndarray:
+        """
+        Vectorized is_point_valid.
+
+        :param coords: (N, 2) array of (lat, lon) rows
+        :return: Boolean array of shape (N,)
+        """
+        valid = self.geofence.contains(coords)
+        for fence in self.no_fly_fences:
+            valid &= ~fence.contains(coords)
+        times = self.departure_times(coords) if self.dynamic_columns.size else None
+        # Rows in chunks keep the points x zones distance matrix small
+        for first in range(0, len(coords), 1024):
+            rows = first + np.flatnonzero(valid[first:first + 1024])
+            if rows.size == 0:
+                continue
+            static = np.flatnonzero(~self.zone_dynamic)
+            inside = (GeographicUtils.haversine_batch(coords[rows, np.newaxis], self.zone_centers[static]) <= self.zone_limits_km[static]).any(axis=1)
+            for column in self.dynamic_columns:
+                active = (self.zone_windows[column, 0] <= times[rows]) & (times[rows] <= self.zone_windows[column, 1])
+                centers = self.zone_centers_at(np.full(len(rows), column), times[rows])
+                inside |= active & (GeographicUtils.haversine_batch(coords[rows], centers) <= self.zone_limits_km[column])
+            valid[rows] = ~inside
+        return valid
+
     def is_path_valid(self, path: List[Point]) -> bool:
-        for point in path:
-            if not self.is_point_valid(point):
-                return False
-        return True
\ No newline at end of file
+        # Segments, not just vertices, must stay inside the fence: concave fences can be cut across
+        return self.path_is_clear_of_red_zones(path) and self.geofence.contains_path(path)
@@ -1,6 +1,7 @@
 
 from typing import List, Tuple
 from GeographicUtils import GeographicUtils
+from Instrumentation import Instrumentation
 from Point import Point
 
 
@@ -12,18 +13,18 @@ class PathAdjuster:
             return path, path, False  # Not enough points to adjust
 
         initial_bearing = GeographicUtils.calculate_bearing(path[0], path[1])
-        print(f"Initial bearing: {initial_bearing}")
         
         yaw_diff = GeographicUtils.calc_yaw_diff(current_yaw, initial_bearing)
+        if Instrumentation.enabled:
+            Instrumentation.event('initial_bearing', bearing=initial_bearing, yaw=current_yaw, yaw_diff=yaw_diff,
+                                  adjusted=abs(yaw_diff) > max_turn_angle)
 
         if abs(yaw_diff) > max_turn_angle:
-            print("Adjusting initial path...")
             path_right = self.generate_adjusted_path(path[0], current_yaw, initial_bearing, max_turn_angle, 1)
             path_left = self.generate_adjusted_path(path[0], current_yaw, initial_bearing, max_turn_angle, -1)
             
             return path_right, path_left, True
         else:
-            print("Initial path is valid")
             return [path[0], path[1]], [path[0], path[1]], False
 
 
@@ -1,37 +1,94 @@
-from typing import List, Tuple
-from scipy.interpolate import splprep, splev
+import math
+import time
+from typing import Callable, List, Optional, Tuple
 import numpy as np
 
 from GeographicUtils import GeographicUtils
+from Instrumentation import Instrumentation
+from LocalFrame import LocalFrame
 from ObstacleAvoidance import ObstacleAvoidance
-from Point import Point,RedZone
-from Visualizer import Visualizer
+from Point import Point,PointArray,RedZone
+from SegmentCache import SegmentCache
+from SparsePath import SparsePath
 
 
 class PathPlanner:
-    def __init__(self, start: Point, goal: Point, red_zones: List[RedZone],boundary_points:List[Point], step_size_km: float = 0.01):
+    def __init__(self, start: Point, goal: Point, red_zones: List[RedZone],boundary_points:List[Point], step_size_km: float = 0.01,
+                 obstacle_avoidance: Optional[ObstacleAvoidance] = None, cache_size: int = 1024,
+                 frame: Optional[LocalFrame] = None, adaptive_step: bool = False, max_step_km: Optional[float] = None,
+                 refine_margin_m: float = 50.0):
         self.start = start
         self.goal = goal
         self.red_zones = red_zones
         self.step_size_km = step_size_km
-        self.obstacle_avoidance = ObstacleAvoidance(red_zones,boundary_points)
+        self.frame = frame
+        # Adaptive spacing keeps the step_size_km grid only within refine_margin_m of an obstacle (see
+        # adaptive_leg); elsewhere a leg gets a point every max_step_km, or none between its endpoints
+        self.adaptive_step = adaptive_step
+        self.max_step_km = max_step_km
+        self.refine_margin_m = refine_margin_m
+        # Share the caller's instance when given so zone updates are seen by both
+        self.obstacle_avoidance = obstacle_avoidance if obstacle_avoidance is not None else ObstacleAvoidance(red_zones,boundary_points,frame=frame)
+        # Fixed-step waypoints of a leg don't depend on the zones, so they are cached on the endpoints alone
+        self.waypoint_cache = SegmentCache(cache_size)
 
-    def generate_waypoints(self, start: Point, goal: Point) -> List[Point]:
-        waypoints = [start]
-        current_location = start
-        
-        while GeographicUtils.haversine(current_location, goal) > self.step_size_km:
-            
-            bearing = GeographicUtils.calculate_bearing(current_location, goal)
-            current_location = GeographicUtils.point_with_bearing(current_location, self.step_size_km * 1000, bearing)
-            
-            waypoints.append(current_location)
-            
-        waypoints.append(goal)
-        return waypoints
+    def generate_waypoints(self, start: Point, goal: Point) -> PointArray:
+        key = self.waypoint_cache.key(start, goal, self.step_size_km)
+        if self.adaptive_step:
+            # Adaptive spacing follows the obstacles, so zone changes must miss
+            key += (self.obstacle_avoidance.version,)
+        waypoints = self.waypoint_cache.get(key)
+        if waypoints is None:
+            Instrumentation.count('segments_generated')
+            if self.adaptive_step:
+                waypoints = self.adaptive_leg(start, goal)
+            elif self.frame is not None:
+                waypoints = PointArray.from_array(self.frame.leg_waypoints(start, goal, self.step_size_km), copy=False)
+            else:
+                waypoints = PointArray(SparsePath.iter_leg(start, goal, self.step_size_km))
+            waypoints.append(goal)
+            self.waypoint_cache.put(key, waypoints)
+        # Hand out a copy so callers can't modify the cached entry
+        return waypoints[:]
+
+    def adaptive_leg(self, start: Point, goal: Point) -> PointArray:
+        """
+        Waypoints of one leg, goal excluded, dense only where it matters.
+
+        Points are the subset of the fixed step_size_km grid that lies within refine_margin_m of an
+        inflated zone, a no-fly polygon or the fence (ObstacleAvoidance.leg_near_intervals), plus every
+        max_step_km in open air. All of them sit on the same straight leg, so the flown track and its
+        clearance are unchanged; only the spacing of the points far from any obstacle grows.
+        """
+        length = GeographicUtils.haversine(start, goal)
+        count = math.ceil(length / self.step_size_km - 1e-9)
+        if count <= 1:
+            # Turn legs and other single steps have nothing to thin out
+            return PointArray([start])
+        steps = np.arange(count)
+        fractions = steps * (self.step_size_km / length)
+        keep = steps % max(1, round(self.max_step_km / self.step_size_km)) == 0 if self.max_step_km else steps == 0
+        for low, high in self.obstacle_avoidance.leg_near_intervals(start, goal, self.refine_margin_m):
+            # Grid points either side of the interval too, so it is covered by full steps end to end
+            first = max(0, math.floor(low * length / self.step_size_km + 1e-9) - 1)
+            keep[first:math.ceil(high * length / self.step_size_km - 1e-9) + 1] = True
+        Instrumentation.count('adaptive_points_skipped', int(len(steps) - keep.sum()))
+        frame = self.frame or LocalFrame(start)
+        return PointArray.from_array(frame.leg_points(start, goal, fractions[keep]), copy=False)
     
-    def generate_complete_path_updated(self, drone_location: Point, middle_points: List[Point], target_location: Point) -> Tuple[List[Point], int]:
-        complete_path = []
+    @property
+    def leg_sampler(self) -> Optional[Callable[[Point, Point], PointArray]]:
+        return self.adaptive_leg if self.adaptive_step else None
+
+    def cache_stats(self) -> dict:
+        return {'waypoints': self.waypoint_cache.stats(), 'clearance': self.obstacle_avoidance.clearance_cache.stats()}
+    
+    def generate_path_through(self, vertices: List[Point]) -> SparsePath:
+        # Keep the vertices in the given order; densify lazily when the path is flown
+        return SparsePath(vertices, self.step_size_km, self.frame, self.leg_sampler)
+    
+    def order_middle_points(self, drone_location: Point, middle_points: List[Point]) -> List[Point]:
+        ordered_points = []
 
         # Start from the drone location
         current_location = drone_location
@@ -51,30 +108,42 @@ class PathPlanner:
         while remaining_middle_points:
             closest_point = find_closest_point(current_location, remaining_middle_points)
             remaining_middle_points.remove(closest_point)
-            
-            # Generate path to the closest middle point
-            path_segment = self.generate_waypoints(current_location, closest_point)
-            
-            # Add to the complete path, excluding the last point to avoid duplicates
-            complete_path += path_segment[:-1]
+            ordered_points.append(closest_point)
             
             # Update the current location
             current_location = closest_point
+
+        return ordered_points
+    
+    def generate_sparse_path(self, drone_location: Point, middle_points: List[Point], target_location: Point) -> Tuple[SparsePath, Optional[int]]:
+        vertices = [drone_location] + self.order_middle_points(drone_location, middle_points)
         
-        if not self.obstacle_avoidance.path_is_clear_of_red_zones(complete_path):
-            last_middle_point_index = len(complete_path)
+        # Vertex index of the last middle point when the legs leading to it are not clear
+        if len(vertices) > 1 and not self.obstacle_avoidance.path_is_clear_of_red_zones(vertices):
+            last_middle_point_index = len(vertices) - 1
         else:
             last_middle_point_index = None
 
-        # Generate the final segment from the last middle point to the target location
-        final_segment = self.generate_waypoints(current_location, target_location)
+        vertices.append(target_location)
+        return SparsePath(vertices, self.step_size_km, self.frame, self.leg_sampler), last_middle_point_index
+    
+    def generate_complete_path_updated(self, drone_location: Point, middle_points: List[Point], target_location: Point) -> Tuple[PointArray, int]:
+        sparse_path, last_vertex_index = self.generate_sparse_path(drone_location, middle_points, target_location)
         
-        # Add the final segment to the complete path
-        complete_path += final_segment
-
+        complete_path = PointArray()
+        last_middle_point_index = None
+        for index, (current_location, next_location) in enumerate(zip(sparse_path, sparse_path[1:])):
+            if index == last_vertex_index:
+                last_middle_point_index = len(complete_path)
+            
+            # Add to the complete path, excluding the last point to avoid duplicates
+            complete_path.extend(self.generate_waypoints(current_location, next_location)[:-1])
+        
+        complete_path.append(target_location)
         return complete_path, last_middle_point_index
     
-    def get_points_around_middle_point(self, zone_details: RedZone, last_middle_point: Point, current_bearing: float) -> Tuple[Point, Point]:
+    def get_points_around_middle_point(self, zone_details: RedZone, last_middle_point: Point, current_bearing: float,
+                                       deadline: Optional[float] = None) -> Tuple[Point, Point]:
         red_zone_radius = zone_details.radius
         
         initial_dist = 10 + zone_details.radius / 1.5
@@ -88,16 +157,17 @@ class PathPlanner:
         right_clear = False
         left_clear = False
 
-        while dist >= min_dist:
+        # Past the deadline the search stops as if every distance had failed
+        while dist >= min_dist and (deadline is None or time.monotonic() < deadline):
             if not right_clear:
                 point_right = GeographicUtils.point_with_bearing(zone_details.center, red_zone_radius + dist, current_bearing + 90)
-                path_right = self.generate_waypoints(last_middle_point, point_right)
-                right_clear = self.obstacle_avoidance.is_path_valid(path_right)
+                right_clear = self.obstacle_avoidance.is_path_valid([last_middle_point, point_right])
+                Instrumentation.count('middle_point_checks')
             
             if not left_clear:
                 point_left = GeographicUtils.point_with_bearing(zone_details.center, red_zone_radius + dist, current_bearing - 90)
-                path_left = self.generate_waypoints(last_middle_point, point_left)
-                left_clear = self.obstacle_avoidance.is_path_valid(path_left)
+                left_clear = self.obstacle_avoidance.is_path_valid([last_middle_point, point_left])
+                Instrumentation.count('middle_point_checks')
 
             if right_clear and left_clear:
                 return point_right, point_left
@@ -107,10 +177,10 @@ class PathPlanner:
         # If all distances fail, return the points with the smallest distance checked
         if not right_clear:
             point_right = point_right_initial
-            print("Right point not clear given the initial distance{}".format(initial_dist))
         if not left_clear:
             point_left = point_left_initial
-            print("Left point not clear given the initial distance{}".format(initial_dist))
+        Instrumentation.event('middle_point_fallback', zone=zone_details.id, initial_dist=initial_dist,
+                              right_clear=right_clear, left_clear=left_clear)
         
         return point_right, point_left
     
@@ -0,0 +1,118 @@
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+from LocalFrame import LocalFrame
+from ObstacleAvoidance import ObstacleAvoidance
+from Point import Point, PointArray
+
+
+class PathSmoother:
+    """
+    Turn-rate-limited smoothing of a planned vertex path.
+
+    Every interior corner is replaced by a circular fillet of radius min_turn_radius_m tangent to
+    both legs, which is the shortest curve a vehicle with that minimum turn radius can fly through
+    the corner (a Dubins turn). Geometry runs in a flat gnomonic frame, where legs are straight, and
+    all corners are filleted in one vectorized pass. A corner keeps its sharp vertex when the fillet
+    does not fit (its tangent points would overrun half of a neighbouring leg) or when the arc would
+    enter an inflated zone or leave the fence; such corners are reported so the caller can replan.
+    The result is sampled every sample_spacing_m or closer.
+    """
+
+    def __init__(self, obstacle_avoidance: ObstacleAvoidance, min_turn_radius_m: float = 80.0,
+                 sample_spacing_m: float = 10.0):
+        self.obstacle_avoidance = obstacle_avoidance
+        self.min_turn_radius_m = min_turn_radius_m
+        self.sample_spacing_m = sample_spacing_m
+
+    def smooth(self, vertices: List[Point]) -> Tuple[PointArray, List[int]]:
+        """
+        :param vertices: Planned path vertices, start and goal included
+        :return: Tuple of (sampled path, indices of the vertices left as sharp corners)
+        """
+        vertices = PointArray(vertices) if not isinstance(vertices, PointArray) else vertices
+        if len(vertices) < 3:
+            return self._sample_polyline(vertices.array), []
+
+        frame = self.obstacle_avoidance.frame or LocalFrame.from_points(vertices)
+        points = frame.to_enu(vertices.array)
+        legs = np.diff(points, axis=0)
+        leg_lengths = np.hypot(legs[:, 0], legs[:, 1])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            directions = legs / leg_lengths[:, np.newaxis]
+
+        # Corner k sits at vertex k + 1, between leg k (incoming) and leg k + 1 (outgoing)
+        incoming, outgoing = directions[:-1], directions[1:]
+        turn = np.arctan2(incoming[:, 0] * outgoing[:, 1] - incoming[:, 1] * outgoing[:, 0],
+                          np.sum(incoming * outgoing, axis=1))
+        tangent_lengths = self.min_turn_radius_m * np.tan(np.abs(turn) / 2)
+        # Neighbouring fillets share a leg, so each may use half of it; the first and last legs belong to one corner only
+        available = leg_lengths / 2
+        available[0] = leg_lengths[0]
+        available[-1] = leg_lengths[-1]
+        fits = (np.abs(turn) > 1e-9) & (tangent_lengths <= available[:-1] + 1e-9) & (tangent_lengths <= available[1:] + 1e-9)
+        fits &= (leg_lengths[:-1] > 0) & (leg_lengths[1:] > 0)
+
+        corners = points[1:-1]
+        arc_starts = corners - tangent_lengths[:, np.newaxis] * incoming
+        # Left normal of the incoming leg, flipped for right turns, points at the fillet centre
+        normals = np.stack([-incoming[:, 1], incoming[:, 0]], axis=1) * np.sign(turn)[:, np.newaxis]
+        centers = arc_starts + self.min_turn_radius_m * normals
+
+        candidates = np.flatnonzero(fits)
+        arcs = {corner: self._arc(centers[corner], arc_starts[corner], turn[corner]) for corner in candidates}
+        if arcs:
+            # One clearance call for the chords of every arc, then a per-arc verdict
+            geodetic = np.split(frame.to_geodetic(np.vstack(list(arcs.values()))), np.cumsum([len(arc) for arc in arcs.values()])[:-1])
+            owners = np.repeat(np.arange(len(candidates)), [len(arc) - 1 for arc in geodetic])
+            valid = self.obstacle_avoidance.segments_are_valid(np.vstack([arc[:-1] for arc in geodetic]),
+                                                               np.vstack([arc[1:] for arc in geodetic]))
+            clear = np.ones(len(candidates), dtype=bool)
+            np.logical_and.at(clear, owners, valid)
+            arcs = {corner: arc for (corner, arc), arc_clear in zip(arcs.items(), clear) if arc_clear}
+
+        sharp_corners = [int(corner) + 1 for corner in np.flatnonzero(np.abs(turn) > 1e-9) if corner not in arcs]
+        # Straight runs between consecutive arcs (or sharp vertices), then the arcs themselves
+        pieces = []
+        position = points[0]
+        for corner in range(len(corners)):
+            if corner in arcs:
+                pieces.append(self._line(position, arcs[corner][0]))
+                pieces.append(arcs[corner][:-1])
+                position = arcs[corner][-1]
+            else:
+                pieces.append(self._line(position, corners[corner]))
+                position = corners[corner]
+        pieces.append(self._line(position, points[-1]))
+        pieces.append(points[-1:])
+
+        samples = frame.to_geodetic(np.vstack(pieces))
+        # Keep the planned endpoints bit-exact
+        samples[0], samples[-1] = vertices.array[0], vertices.array[-1]
+        return PointArray.from_array(samples, copy=False), sharp_corners
+
+    def _arc(self, center: np.ndarray, arc_start: np.ndarray, turn: float) -> np.ndarray:
+        # Arc from arc_start sweeping `turn` radians around center, both ends included
+        count = max(1, math.ceil(abs(turn) * self.min_turn_radius_m / self.sample_spacing_m))
+        start_angle = math.atan2(arc_start[1] - center[1], arc_start[0] - center[0])
+        angles = start_angle + np.linspace(0, turn, count + 1)
+        return center + self.min_turn_radius_m * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+
+    def _line(self, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        # Evenly spaced points from start towards end, end excluded; nothing when they coincide
+        length = float(np.hypot(*(end - start)))
+        if length < 1e-6:
+            return np.empty((0, 2))
+        count = max(1, math.ceil(length / self.sample_spacing_m - 1e-9))
+        return start + np.arange(count)[:, np.newaxis] / count * (end - start)
+
+    def _sample_polyline(self, coords: np.ndarray) -> PointArray:
+        if len(coords) < 2:
+            return PointArray.from_array(coords)
+        frame = self.obstacle_avoidance.frame or LocalFrame.from_points(PointArray.from_array(coords))
+        points = frame.to_enu(coords)
+        samples = frame.to_geodetic(np.vstack([self._line(points[0], points[1]), points[1:]]))
+        samples[0], samples[-1] = coords[0], coords[-1]
+        return PointArray.from_array(samples, copy=False)
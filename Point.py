@@ -1,12 +1,118 @@
+import operator
 from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Union
 
-@dataclass
+import numpy as np
+
+@dataclass(frozen=True, slots=True)
 class Point:
     lat: float = 0.0
     lon: float = 0.0
 
-@dataclass
+@dataclass(slots=True)
 class RedZone:
     id: int
     center: Point
     radius: float
+    # Optional motion and lifetime on the mission clock (seconds): center is the position at time 0,
+    # and the zone only exists between active_from and active_until. The defaults make a static zone.
+    velocity_north_mps: float = 0.0
+    velocity_east_mps: float = 0.0
+    active_from: float = float('-inf')
+    active_until: float = float('inf')
+
+    @property
+    def is_dynamic(self) -> bool:
+        return (self.velocity_north_mps != 0 or self.velocity_east_mps != 0
+                or self.active_from != float('-inf') or self.active_until != float('inf'))
+
+@dataclass(slots=True)
+class PolygonZone:
+    id: int
+    vertices: List[Point]
+
+
+class PointArray:
+    """
+    List-like sequence of points backed by one contiguous (N, 2) float64 buffer of (lat, lon) rows.
+
+    Indexing and iteration hand out Point values, so code written against List[Point] keeps working,
+    while vectorized code reads the raw rows through .array without copying. Appends grow the buffer
+    geometrically instead of allocating one object per waypoint.
+    """
+
+    def __init__(self, points: Iterable[Point] = (), capacity: int = 16):
+        self._buffer = np.empty((max(capacity, 1), 2), dtype=np.float64)
+        self._size = 0
+        self.extend(points)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray, copy: bool = True) -> 'PointArray':
+        array = np.asarray(array, dtype=np.float64).reshape(-1, 2)
+        points = cls.__new__(cls)
+        points._buffer = np.array(array) if copy else np.ascontiguousarray(array)
+        points._size = len(array)
+        return points
+
+    @property
+    def array(self) -> np.ndarray:
+        # View of the live rows; shares memory with the container
+        return self._buffer[:self._size]
+
+    def _reserve(self, size: int) -> None:
+        if size > len(self._buffer):
+            buffer = np.empty((max(size, 2 * len(self._buffer)), 2), dtype=np.float64)
+            buffer[:self._size] = self._buffer[:self._size]
+            self._buffer = buffer
+
+    def append(self, point: Point) -> None:
+        self._reserve(self._size + 1)
+        self._buffer[self._size] = (point.lat, point.lon)
+        self._size += 1
+
+    def extend(self, points: Iterable[Point]) -> None:
+        if isinstance(points, PointArray):
+            rows = points.array
+        else:
+            rows = np.array([(point.lat, point.lon) for point in points], dtype=np.float64).reshape(-1, 2)
+        self._reserve(self._size + len(rows))
+        self._buffer[self._size:self._size + len(rows)] = rows
+        self._size += len(rows)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Point, 'PointArray']:
+        if isinstance(index, slice):
+            return PointArray.from_array(self.array[index])
+        index = operator.index(index)
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("PointArray index out of range")
+        lat, lon = self._buffer[index]
+        return Point(float(lat), float(lon))
+
+    def __iter__(self) -> Iterator[Point]:
+        for lat, lon in self.array.tolist():
+            yield Point(lat, lon)
+
+    def __add__(self, other: Iterable[Point]) -> 'PointArray':
+        points = PointArray.from_array(self.array)
+        points.extend(other)
+        return points
+
+    def __radd__(self, other: Iterable[Point]) -> 'PointArray':
+        points = PointArray(other)
+        points.extend(self)
+        return points
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PointArray):
+            return np.array_equal(self.array, other.array)
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PointArray({list(self)!r})"
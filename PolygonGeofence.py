@@ -0,0 +1,303 @@
+from bisect import bisect_right
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from GeographicUtils import GeographicUtils
+from Point import Point, RedZone
+
+
+class PolygonGeofence:
+    """
+    Simple polygon over (lat, lon) vertices with precomputed slab decomposition.
+
+    The polygon is cut into horizontal slabs at every distinct vertex latitude. Inside a slab no
+    vertex starts or ends, so the edges spanning it never cross and keep one west-to-east order
+    (a polygon whose edges cross, such as corners listed out of boundary order, is rejected with
+    ValueError while the slabs are built); they are stored sorted per slab in one padded (slabs x edges x 4) array. A point query is a
+    binary search for its slab and then for its position among that slab's edges, so it costs
+    O(log V) however complex the fence; an odd number of edges to the west means inside. A segment
+    whose ends share a slab and a position stays in that trapezoid, so only the rare segments that
+    span slabs or edges get the exact boundary-contact test. Everything is vectorized over many
+    points/segments at once. The polygon is closed:
+    points on an edge count as inside. Coordinates are treated as planar degrees, which is exact
+    enough at field scale.
+    """
+
+    # Points this close to an edge count as on it (~10 cm); also absorbs the few-mm poleward bulge of
+    # great-circle legs flown along a fence edge between two vertices
+    EDGE_TOLERANCE_DEG = 1e-6
+    SCALAR_PATH_MAX_POINTS = 8
+
+    def __init__(self, vertices: Iterable[Point]):
+        coords = GeographicUtils.to_array(vertices)
+        if len(coords) > 1 and np.array_equal(coords[0], coords[-1]):
+            coords = coords[:-1]
+        if len(coords) < 3:
+            raise ValueError(f"A polygon needs at least 3 vertices, got {len(coords)}")
+        self.vertices = coords
+        # (E, 4) rows of (lat0, lon0, lat1, lon1), edge i runs from vertex i to vertex i + 1
+        self.edges = np.hstack([coords, np.roll(coords, -1, axis=0)])
+        self.min_lat, self.min_lon = coords.min(axis=0)
+        self.max_lat, self.max_lon = coords.max(axis=0)
+        self._build_slabs()
+
+    def _build_slabs(self) -> None:
+        self.slab_lats = np.unique(self.vertices[:, 0])
+        low = np.minimum(self.edges[:, 0], self.edges[:, 2])
+        high = np.maximum(self.edges[:, 0], self.edges[:, 2])
+        members = []
+        for bottom, top in zip(self.slab_lats[:-1], self.slab_lats[1:]):
+            edge_indices = np.flatnonzero((low <= bottom) & (high >= top))
+            # Edges never cross inside a slab, so their west-to-east order at mid-height holds across it
+            order = np.argsort(self._lon_at(self.edges[edge_indices], (bottom + top) / 2))
+            members.append(edge_indices[order])
+            self._check_slab_uncrossed(edge_indices[order], bottom, top)
+        self._check_flat_edges_uncrossed(low, high)
+
+        # Row 0 and the last row are the empty slabs below and above the polygon; NaN pads the rest
+        width = max(map(len, members))
+        self.slab_edges = np.full((len(members) + 2, width, 4), np.nan)
+        self.slab_counts = np.zeros(len(members) + 2, dtype=np.intp)
+        for slab, edge_indices in enumerate(members, start=1):
+            self.slab_edges[slab, :len(edge_indices)] = self.edges[edge_indices]
+            self.slab_counts[slab] = len(edge_indices)
+        self.search_steps = int(width).bit_length()
+        self.flat_edges = self.edges[low == high]
+        # Plain-float copies for single-point queries, where NumPy call overhead would dominate
+        self._slab_lat_list = self.slab_lats.tolist()
+        self._slab_edge_lists = [self.slab_edges[slab, :count].tolist() for slab, count in enumerate(self.slab_counts)]
+
+    def _check_slab_uncrossed(self, edge_indices: np.ndarray, bottom: float, top: float) -> None:
+        # Rejects a self-intersecting polygon (e.g. corners listed out of boundary order), where slab
+        # parity gives wrong answers: edges spanning a slab cross inside it exactly when their
+        # west-to-east order at its bottom or top differs from the one at mid-height
+        edges = self.edges[edge_indices]
+        for lat in (bottom, top):
+            # Edges sharing a vertex meet there; only a real swap in order is a crossing
+            swapped = np.flatnonzero(np.diff(self._lon_at(edges, lat)) < -1e-12)
+            if swapped.size:
+                self._raise_crossing(edge_indices[swapped[0]], edge_indices[swapped[0] + 1])
+
+    def _check_flat_edges_uncrossed(self, low: np.ndarray, high: np.ndarray) -> None:
+        # Flat edges sit on slab boundaries, so the slab check can't see them: one crosses any edge
+        # passing through its latitude strictly between its longitudes
+        for flat in np.flatnonzero(low == high):
+            lat = self.edges[flat, 0]
+            through = np.flatnonzero((low < lat) & (high > lat))
+            lons = self._lon_at(self.edges[through], lat)
+            west, east = sorted(self.edges[flat, 1::2])
+            crossing = through[(lons > west) & (lons < east)]
+            if crossing.size:
+                self._raise_crossing(flat, crossing[0])
+
+    def _raise_crossing(self, first: int, second: int) -> None:
+        first, second = sorted((int(first), int(second)))
+        raise ValueError(f"Polygon edges {first} and {second} cross; vertices must be listed in order along "
+                         f"the boundary, got {self.vertices.tolist()}")
+
+    @staticmethod
+    def _lon_at(edges: np.ndarray, lat: np.ndarray) -> np.ndarray:
+        lat0, lon0, lat1, lon1 = np.moveaxis(edges, -1, 0)
+        return lon0 + (lat - lat0) * (lon1 - lon0) / (lat1 - lat0)
+
+    def slab_of(self, lats: np.ndarray) -> np.ndarray:
+        # Row in slab_edges per latitude
+        return np.searchsorted(self.slab_lats, lats, side='right')
+
+    def _positions(self, slabs: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        # Vectorized binary search: number of slab edges strictly west of each point
+        low = np.zeros(len(slabs), dtype=np.intp)
+        high = self.slab_counts[slabs]
+        last = self.slab_edges.shape[1] - 1
+        for _ in range(self.search_steps):
+            active = low < high
+            middle = (low + high) // 2
+            west = self._lon_at(self.slab_edges[slabs, np.minimum(middle, last)], lat) < lon
+            low = np.where(active & west, middle + 1, low)
+            high = np.where(active & ~west, middle, high)
+        return low
+
+    def contains(self, coords: np.ndarray) -> np.ndarray:
+        """
+        :param coords: (N, 2) array of (lat, lon) rows
+        :return: Boolean array of shape (N,), True where the point is inside or on the polygon
+        """
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        lat, lon = coords[:, 0], coords[:, 1]
+        inside = self._positions(self.slab_of(lat), lat, lon) % 2 == 1
+        outside = np.flatnonzero(~inside)
+        if outside.size:
+            inside[outside] = self._on_boundary(coords[outside])
+        return inside
+
+    def locate(self, lat: float, lon: float) -> Tuple[int, int]:
+        # Scalar (slab, number of slab edges west of the point); same rule as _positions
+        slab = bisect_right(self._slab_lat_list, lat)
+        edges = self._slab_edge_lists[slab]
+        low, high = 0, len(edges)
+        while low < high:
+            middle = (low + high) // 2
+            lat0, lon0, lat1, lon1 = edges[middle]
+            if lon0 + (lat - lat0) * (lon1 - lon0) / (lat1 - lat0) < lon:
+                low = middle + 1
+            else:
+                high = middle
+        return slab, low
+
+    def contains_point(self, point: Point) -> bool:
+        tolerance = self.EDGE_TOLERANCE_DEG
+        if not (self.min_lat - tolerance <= point.lat <= self.max_lat + tolerance and
+                self.min_lon - tolerance <= point.lon <= self.max_lon + tolerance):
+            return False
+        if self.locate(point.lat, point.lon)[1] % 2 == 1:
+            return True
+        return bool(self._on_boundary(np.array([[point.lat, point.lon]]))[0])
+
+    def _on_boundary(self, coords: np.ndarray) -> np.ndarray:
+        # A point on an edge is next to it in its slab (or the slab across a vertex latitude), or on a flat edge
+        tolerance = self.EDGE_TOLERANCE_DEG
+        lat, lon = coords[:, 0], coords[:, 1]
+        last = self.slab_edges.shape[1] - 1
+        candidates = []
+        for slabs in (self.slab_of(lat - tolerance), self.slab_of(lat + tolerance)):
+            positions = self._positions(slabs, lat, lon)
+            candidates += [self.slab_edges[slabs, np.clip(positions + offset, 0, last)] for offset in (-1, 0)]
+        candidates = np.concatenate([np.stack(candidates, axis=1),
+                                     np.broadcast_to(self.flat_edges, (len(coords),) + self.flat_edges.shape)], axis=1)
+        lat0, lon0, lat1, lon1 = np.moveaxis(candidates, -1, 0)
+        lat, lon = coords[:, 0:1], coords[:, 1:2]
+        cross = (lon1 - lon0) * (lat - lat0) - (lat1 - lat0) * (lon - lon0)
+        length = np.hypot(lat1 - lat0, lon1 - lon0)
+        within = ((np.minimum(lat0, lat1) - tolerance <= lat) & (lat <= np.maximum(lat0, lat1) + tolerance) &
+                  (np.minimum(lon0, lon1) - tolerance <= lon) & (lon <= np.maximum(lon0, lon1) + tolerance))
+        return (within & (np.abs(cross) <= tolerance * length)).any(axis=1)
+
+    def _shared_trapezoid(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        # Parity (1 inside, 0 outside) of the slab trapezoid holding both ends of a segment, -1 if they differ.
+        # A segment can't leave the convex trapezoid its ends share, so those need no further test.
+        shared = np.full(len(starts), -1, dtype=np.intp)
+        slabs = self.slab_of(starts[:, 0])
+        rows = np.flatnonzero(slabs == self.slab_of(ends[:, 0]))
+        if rows.size:
+            start_positions = self._positions(slabs[rows], starts[rows, 0], starts[rows, 1])
+            end_positions = self._positions(slabs[rows], ends[rows, 0], ends[rows, 1])
+            shared[rows] = np.where(start_positions == end_positions, start_positions % 2, -1)
+        return shared
+
+    def _boundary_fractions(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """
+        Fractions along each segment where it meets the polygon boundary.
+
+        :return: (M, 2 + E + V) array, sorted per row: 0, 1, the edge intersections and the vertices lying
+                 on the segment (which also covers collinear overlaps), NaN where there is none
+        """
+        d_lat, d_lon = (ends - starts).T[:, :, np.newaxis]
+        lat0, lon0, lat1, lon1 = self.edges.T[:, np.newaxis, :]
+        e_lat, e_lon = lat1 - lat0, lon1 - lon0
+        w_lat, w_lon = lat0 - starts[:, 0:1], lon0 - starts[:, 1:2]
+        v_lat, v_lon = self.vertices[:, 0] - starts[:, 0:1], self.vertices[:, 1] - starts[:, 1:2]
+        length_squared = d_lat ** 2 + d_lon ** 2
+        denominator = d_lon * e_lat - d_lat * e_lon
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (w_lon * e_lat - w_lat * e_lon) / denominator
+            u = (w_lon * d_lat - w_lat * d_lon) / denominator
+            along = (v_lat * d_lat + v_lon * d_lon) / length_squared
+        t = np.where((denominator != 0) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1), t, np.nan)
+        on_segment = np.abs(d_lon * v_lat - d_lat * v_lon) <= self.EDGE_TOLERANCE_DEG * np.sqrt(length_squared)
+        along = np.where(on_segment & (along >= 0) & (along <= 1), along, np.nan)
+        ends_of_segment = np.tile([0.0, 1.0], (len(starts), 1))
+        return np.sort(np.hstack([ends_of_segment, t, along]), axis=1)
+
+    def segments_inside(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """
+        :param starts: (M, 2) array of segment start (lat, lon) rows
+        :param ends: (M, 2) array of segment end (lat, lon) rows
+        :return: Boolean array of shape (M,), True where the whole segment lies inside or on the polygon
+        """
+        inside = self.contains(np.vstack([starts, ends])).reshape(2, -1).all(axis=0)
+        rows = np.flatnonzero(inside & (self._shared_trapezoid(starts, ends) != 1))
+        if rows.size:
+            # Between consecutive boundary contacts the segment is either wholly inside or wholly outside,
+            # so one test point per piece decides it, even for segments that only graze vertices
+            fractions = self._boundary_fractions(starts[rows], ends[rows])
+            middles = (fractions[:, :-1] + fractions[:, 1:]) / 2
+            pieces = np.argwhere(fractions[:, 1:] > fractions[:, :-1])
+            delta = ends[rows] - starts[rows]
+            probes = starts[rows][pieces[:, 0]] + middles[pieces[:, 0], pieces[:, 1], np.newaxis] * delta[pieces[:, 0]]
+            outside_rows = pieces[~self.contains(probes), 0]
+            inside[rows[outside_rows]] = False
+        return inside
+
+    def segments_intersect(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """
+        :param starts: (M, 2) array of segment start (lat, lon) rows
+        :param ends: (M, 2) array of segment end (lat, lon) rows
+        :return: Boolean array of shape (M,), True where the segment touches the polygon anywhere
+        """
+        shared = self._shared_trapezoid(starts, ends)
+        touching = shared == 1
+        rows = np.flatnonzero(shared == 0)
+        if rows.size:
+            touching[rows] = self.contains(np.vstack([starts[rows], ends[rows]])).reshape(2, -1).any(axis=0)
+        rows = np.flatnonzero(shared == -1)
+        if rows.size:
+            # Any boundary contact besides the segment's own ends, or an end inside
+            fractions = self._boundary_fractions(starts[rows], ends[rows])
+            touching[rows] = ((np.count_nonzero(~np.isnan(fractions), axis=1) > 2) |
+                              self.contains(np.vstack([starts[rows], ends[rows]])).reshape(2, -1).any(axis=0))
+        return touching
+
+    def contains_path(self, path: List[Point]) -> bool:
+        if len(path) <= self.SCALAR_PATH_MAX_POINTS:
+            # Short polylines (candidate legs): settled without NumPy when every point sits in the same inside trapezoid
+            trapezoids = {self.locate(point.lat, point.lon) for point in path}
+            if len(trapezoids) == 1 and next(iter(trapezoids))[1] % 2 == 1:
+                return True
+        coords = GeographicUtils.to_array(path)
+        if len(coords) < 2:
+            return bool(self.contains(coords).all())
+        return bool(self.segments_inside(coords[:-1], coords[1:]).all())
+
+    def entry_fraction(self, start: Point, end: Point) -> float:
+        """
+        :return: Fraction t in [0, 1] along start -> end where the segment first touches the polygon
+        """
+        if self.contains_point(start):
+            return 0.0
+        d_lat, d_lon = end.lat - start.lat, end.lon - start.lon
+        lat0, lon0, lat1, lon1 = self.edges.T
+        e_lat, e_lon = lat1 - lat0, lon1 - lon0
+        denominator = d_lon * e_lat - d_lat * e_lon
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = ((lon0 - start.lon) * e_lat - (lat0 - start.lat) * e_lon) / denominator
+            u = ((lon0 - start.lon) * d_lat - (lat0 - start.lat) * d_lon) / denominator
+        hits = t[(denominator != 0) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)]
+        # No edge hit means the segment only grazes a vertex or runs along an edge; take its midpoint
+        return float(hits.min()) if hits.size else 0.5
+
+    def convex_corners(self, margin_m: float) -> np.ndarray:
+        """
+        Convex vertices pushed margin_m outwards along their corner bisector, as waypoints that clear the polygon.
+
+        :return: (N, 2) array of (lat, lon) rows
+        """
+        lat_per_m, lon_per_m = GeographicUtils.meters_to_degrees(1, float(self.vertices[:, 0].mean()))
+        metres = self.vertices / np.array([lat_per_m, lon_per_m])
+        incoming = metres - np.roll(metres, 1, axis=0)
+        outgoing = np.roll(metres, -1, axis=0) - metres
+        incoming /= np.linalg.norm(incoming, axis=1, keepdims=True)
+        outgoing /= np.linalg.norm(outgoing, axis=1, keepdims=True)
+        turn = incoming[:, 0] * outgoing[:, 1] - incoming[:, 1] * outgoing[:, 0]
+        # Shoelace sign gives the winding; convex corners turn the same way, reflex ones never lie on a shortest path
+        winding = np.sign(np.sum(metres[:, 0] * np.roll(metres[:, 1], -1) - np.roll(metres[:, 0], -1) * metres[:, 1]))
+        convex = turn * winding > 0
+        bisector = incoming[convex] - outgoing[convex]
+        bisector /= np.linalg.norm(bisector, axis=1, keepdims=True)
+        return (metres[convex] + margin_m * bisector) * np.array([lat_per_m, lon_per_m])
+
+    def enclosing_zone(self, zone_id: int) -> RedZone:
+        # Circle around the vertex centroid covering every vertex, for planners that steer around circles
+        center = Point(float(self.vertices[:, 0].mean()), float(self.vertices[:, 1].mean()))
+        radius_km = GeographicUtils.haversine_batch(self.vertices, np.array([center.lat, center.lon])).max()
+        return RedZone(zone_id, center, float(radius_km) * 1000)
@@ -0,0 +1,100 @@
+import math
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from GeographicUtils import GeographicUtils
+from Point import Point,RedZone
+
+
+class RedZoneIndex:
+    """
+    Uniform lat/lon grid over the inflated bounding boxes of red zones.
+
+    Every zone is registered in each cell its inflated circle's bounding box overlaps, so point and
+    segment queries only have to look at the zones registered in the cells they touch. Zones are
+    keyed by their id, which must be unique, and can be inserted or removed one at a time without
+    rebuilding the grid.
+    """
+
+    def __init__(self, red_zones: Iterable[RedZone] = (), cell_size_deg: float = 0.005):
+        self.cell_size_deg = cell_size_deg
+        self.cells: Dict[Tuple[int, int], Set[int]] = {}
+        self.zones: Dict[int, RedZone] = {}
+        self.zone_cells: Dict[int, List[Tuple[int, int]]] = {}
+        for zone in red_zones:
+            self.insert(zone)
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    @staticmethod
+    def inflated_radius(zone: RedZone) -> float:
+        # Same inflation ObstacleAvoidance applies, in meters
+        return zone.radius + (zone.radius / 6)
+
+    def cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_size_deg), math.floor(lon / self.cell_size_deg)
+
+    def insert(self, zone: RedZone) -> None:
+        if zone.id in self.zones:
+            raise ValueError(f"Red zone {zone.id} is already indexed")
+
+        # Small margin so meters_to_degrees' flat-earth constant never under-covers the circle
+        radius_lat, radius_lon = GeographicUtils.meters_to_degrees(self.inflated_radius(zone) * 1.01, zone.center.lat)
+        min_i, min_j = self.cell_of(zone.center.lat - radius_lat, zone.center.lon - radius_lon)
+        max_i, max_j = self.cell_of(zone.center.lat + radius_lat, zone.center.lon + radius_lon)
+
+        cells = [(i, j) for i in range(min_i, max_i + 1) for j in range(min_j, max_j + 1)]
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(zone.id)
+        self.zones[zone.id] = zone
+        self.zone_cells[zone.id] = cells
+
+    def remove(self, zone_id: int) -> RedZone:
+        zone = self.zones.pop(zone_id)
+        for cell in self.zone_cells.pop(zone_id):
+            bucket = self.cells[cell]
+            bucket.discard(zone_id)
+            if not bucket:
+                del self.cells[cell]
+        return zone
+
+    def query_point(self, point: Point) -> List[RedZone]:
+        return [self.zones[zone_id] for zone_id in self.cells.get(self.cell_of(point.lat, point.lon), ())]
+
+    def cells_on_segment(self, point1: Point, point2: Point) -> Iterator[Tuple[int, int]]:
+        """
+        Grid traversal (Amanatides & Woo) of every cell the segment passes through.
+        """
+        x0, y0 = point1.lat / self.cell_size_deg, point1.lon / self.cell_size_deg
+        x1, y1 = point2.lat / self.cell_size_deg, point2.lon / self.cell_size_deg
+        i, j = math.floor(x0), math.floor(y0)
+        i_end, j_end = math.floor(x1), math.floor(y1)
+        yield i, j
+
+        step_i = 1 if x1 > x0 else -1
+        step_j = 1 if y1 > y0 else -1
+        t_delta_i = abs(1 / (x1 - x0)) if x1 != x0 else math.inf
+        t_delta_j = abs(1 / (y1 - y0)) if y1 != y0 else math.inf
+        t_max_i = ((i + 1 - x0) if step_i > 0 else (x0 - i)) * t_delta_i if x1 != x0 else math.inf
+        t_max_j = ((j + 1 - y0) if step_j > 0 else (y0 - j)) * t_delta_j if y1 != y0 else math.inf
+
+        for _ in range(abs(i_end - i) + abs(j_end - j)):
+            if t_max_i < t_max_j:
+                i += step_i
+                t_max_i += t_delta_i
+            else:
+                j += step_j
+                t_max_j += t_delta_j
+            yield i, j
+
+    def query_path(self, path: List[Point]) -> List[RedZone]:
+        """
+        Candidate zones for a polyline: every zone registered in a cell any of its segments touches.
+        """
+        zone_ids: Set[int] = set()
+        if len(path) == 1:
+            zone_ids.update(self.cells.get(self.cell_of(path[0].lat, path[0].lon), ()))
+        for point1, point2 in zip(path, path[1:]):
+            for cell in self.cells_on_segment(point1, point2):
+                zone_ids.update(self.cells.get(cell, ()))
+        return [self.zones[zone_id] for zone_id in zone_ids]
@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from Point import Point
+
+
+class SegmentCache:
+    """
+    Bounded LRU cache for per-segment results (waypoints, clearance verdicts).
+
+    Keys are built from segment endpoints quantized to `precision` decimal degrees (1e-7 deg is about
+    1 cm), plus any extra discriminator such as a zone-set version, so repeated planning of the same
+    leg hits the cache even when the endpoints were recomputed. Hit, miss and eviction counters show
+    how much repeated work the cache is saving.
+    """
+
+    def __init__(self, maxsize: int = 4096, precision: int = 7):
+        self.maxsize = maxsize
+        self.precision = precision
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Locks can't be pickled (e.g. when a planner is shipped to a worker process)
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def quantize(self, point: Point) -> Tuple[int, int]:
+        scale = 10 ** self.precision
+        return round(point.lat * scale), round(point.lon * scale)
+
+    def key(self, start: Point, goal: Point, *extra: Hashable) -> tuple:
+        return self.quantize(start) + self.quantize(goal) + extra
+
+    def segment_keys(self, coords: np.ndarray, *extra: Hashable) -> List[tuple]:
+        # Keys for every consecutive (lat, lon) row pair, built in one vectorized pass
+        quantized = np.round(coords * 10 ** self.precision).astype(np.int64)
+        pairs = np.hstack([quantized[:-1], quantized[1:]]).tolist()
+        return [tuple(pair) + extra for pair in pairs]
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self.entries), 'maxsize': self.maxsize}
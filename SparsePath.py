@@ -0,0 +1,115 @@
+from typing import Callable, Generator, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from GeographicUtils import GeographicUtils
+from Instrumentation import Instrumentation
+from LocalFrame import LocalFrame
+from Point import Point, PointArray
+
+
+class SparsePath:
+    """
+    A path stored as its vertices only.
+
+    Planning and clearance checks work on the vertices directly; the evenly spaced waypoints the
+    flight controller consumes are produced lazily by densify(), one leg at a time.
+    """
+
+    def __init__(self, vertices: Iterable[Point] = (), step_size_km: float = 0.01, frame: Optional[LocalFrame] = None,
+                 leg_sampler: Optional[Callable[[Point, Point], Iterable[Point]]] = None):
+        self.vertices = vertices if isinstance(vertices, PointArray) else PointArray(vertices)
+        self.step_size_km = step_size_km
+        # When set, legs are densified in the flat frame instead of by repeated spherical stepping
+        self.frame = frame
+        # When set, replaces the fixed step: leg_sampler(start, goal) yields a leg's waypoints, goal excluded
+        self.leg_sampler = leg_sampler
+
+    def __len__(self) -> int:
+        return len(self.vertices)
+
+    def __iter__(self) -> Iterator[Point]:
+        return iter(self.vertices)
+
+    def __getitem__(self, index):
+        return self.vertices[index]
+
+    def __add__(self, other: Iterable[Point]) -> 'SparsePath':
+        vertices = other if isinstance(other, PointArray) else PointArray(other)
+        # The second path usually starts where this one ends; don't repeat the joint vertex
+        if len(self.vertices) and len(vertices) and vertices[0] == self.vertices[-1]:
+            vertices = vertices[1:]
+        return SparsePath(self.vertices + vertices, self.step_size_km, self.frame, self.leg_sampler)
+
+    def __radd__(self, other: Iterable[Point]) -> 'SparsePath':
+        return SparsePath(other, self.step_size_km, self.frame, self.leg_sampler) + self
+
+    def length_km(self) -> float:
+        coords = self.vertices.array
+        return float(GeographicUtils.haversine_batch(coords[:-1], coords[1:]).sum())
+
+    def locate(self, point: Point) -> int:
+        """
+        Index of the segment closest to point, using a local flat approximation around point.
+        """
+        coords = self.vertices.array
+        if len(coords) < 2:
+            return 0
+        cos_lat = np.cos(np.radians(point.lat))
+        scale = np.array([1.0, cos_lat])
+        starts = (coords[:-1] - (point.lat, point.lon)) * scale
+        deltas = (coords[1:] - coords[:-1]) * scale
+        lengths = (deltas ** 2).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.clip(np.where(lengths > 0, -(starts * deltas).sum(axis=1) / lengths, 0.0), 0.0, 1.0)
+        closest = starts + t[:, np.newaxis] * deltas
+        return int(np.argmin((closest ** 2).sum(axis=1)))
+
+    def split_at_distance(self, distance_km: float) -> Tuple['SparsePath', 'SparsePath']:
+        """
+        Split distance_km along the path (never before the first leg). Inside a leg, a vertex is
+        inserted on the leg at that distance, so long legs are cut too.
+
+        :return: Tuple of (head, tail); the split vertex ends head and starts tail
+        """
+        coords = self.vertices.array
+        if len(coords) < 2:
+            return SparsePath(self.vertices, self.step_size_km, self.frame, self.leg_sampler), SparsePath(self.vertices[-1:], self.step_size_km, self.frame, self.leg_sampler)
+        legs = GeographicUtils.haversine_batch(coords[:-1], coords[1:])
+        travelled = np.cumsum(legs)
+        leg = min(int(np.searchsorted(travelled, distance_km)), len(legs) - 1)
+        beyond_km = travelled[leg] - max(distance_km, 0.0)
+        if beyond_km <= 1e-9 or beyond_km >= legs[leg] - 1e-9:
+            # On a vertex: the leg's end (also past the path's end) or its start, but never before the first leg
+            split = leg + 1 if beyond_km <= 1e-9 or leg == 0 else leg
+            head, tail = self.vertices[:split + 1], self.vertices[split:]
+        else:
+            start, goal = self.vertices[leg], self.vertices[leg + 1]
+            split = (self.frame or LocalFrame(start)).leg_points(start, goal, np.array([0.0, 1 - beyond_km / legs[leg]]))[1:]
+            head = self.vertices[:leg + 1] + PointArray.from_array(split)
+            tail = PointArray.from_array(split) + self.vertices[leg + 1:]
+        return (SparsePath(head, self.step_size_km, self.frame, self.leg_sampler),
+                SparsePath(tail, self.step_size_km, self.frame, self.leg_sampler))
+
+    def densify(self, include_last: bool = True) -> Generator[Point, None, None]:
+        for start, goal in zip(self.vertices, self.vertices[1:]):
+            Instrumentation.count('segments_generated')
+            if self.leg_sampler is not None:
+                yield from self.leg_sampler(start, goal)
+            elif self.frame is not None:
+                yield from self.frame.iter_leg(start, goal, self.step_size_km)
+            else:
+                yield from self.iter_leg(start, goal, self.step_size_km)
+        if include_last and len(self.vertices):
+            yield self.vertices[-1]
+
+    @staticmethod
+    def iter_leg(start: Point, goal: Point, step_size_km: float) -> Generator[Point, None, None]:
+        # Waypoints every step_size_km from start towards goal, goal itself excluded. Legs that are
+        # exactly one step long (e.g. PathAdjuster turns) must not grow a rounding-error waypoint.
+        current_location = start
+        yield current_location
+        while GeographicUtils.haversine(current_location, goal) > step_size_km + 1e-9:
+            bearing = GeographicUtils.calculate_bearing(current_location, goal)
+            current_location = GeographicUtils.point_with_bearing(current_location, step_size_km * 1000, bearing)
+            yield current_location
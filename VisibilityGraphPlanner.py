@@ -0,0 +1,117 @@
+import heapq
+import math
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from GeographicUtils import GeographicUtils
+from ObstacleAvoidance import ObstacleAvoidance
+from Point import Point, PointArray
+from RedZoneIndex import RedZoneIndex
+
+
+class VisibilityGraphPlanner:
+    """
+    Global planner over a visibility graph of the red zones.
+
+    Every inflated zone circle is wrapped in a regular polygon whose edges are tangent to a slightly
+    enlarged circle, so consecutive ring vertices always see each other. The graph nodes are those
+    ring vertices, the convex corners of every no-fly polygon pushed slightly outwards, the boundary
+    corners, start and goal; edges are the straight segments between them that are clear of every
+    zone and stay inside the geofence. A* with haversine cost and heuristic then returns the shortest clear polyline in a
+    single pass. Edges are discovered lazily, one vectorized clearance call per expanded node; that call
+    (ObstacleAvoidance.fan_is_valid) only tests the zones each edge points at, so an expansion costs
+    O(nodes log nodes + zones) plus the edge/zone pairs that can actually collide.
+    """
+
+    def __init__(self, obstacle_avoidance: ObstacleAvoidance, boundary_points: List[Point],
+                 ring_size: int = 16, clearance_margin: float = 1.05, polygon_margin_m: float = 5.0):
+        self.obstacle_avoidance = obstacle_avoidance
+        self.boundary_points = boundary_points
+        self.ring_size = ring_size
+        self.clearance_margin = clearance_margin
+        self.polygon_margin_m = polygon_margin_m
+        # Graph nodes only depend on the zones, so they are rebuilt only when the zone set changes
+        self._nodes = None
+        self._nodes_version = None
+
+    def build_nodes(self) -> np.ndarray:
+        bearings = np.arange(self.ring_size) * (360 / self.ring_size)
+        rings = []
+        _, departure_time = self.obstacle_avoidance.departure
+        for zone in self.obstacle_avoidance.red_zones:
+            if zone.is_dynamic:
+                # Ring the zone where it is when the drone could first reach it
+                center = self.obstacle_avoidance.zone_at(zone, departure_time).center
+                zone = self.obstacle_avoidance.zone_at(zone, self.obstacle_avoidance.departure_times(np.array([[center.lat, center.lon]]))[0])
+            # Circumscribe the enlarged circle so the polygon edges stay outside the zone
+            ring_radius = RedZoneIndex.inflated_radius(zone) * self.clearance_margin / math.cos(math.pi / self.ring_size)
+            center = np.array([zone.center.lat, zone.center.lon])
+            rings.append(GeographicUtils.point_with_bearing_batch(center, ring_radius, bearings))
+        for fence in self.obstacle_avoidance.no_fly_fences:
+            rings.append(fence.convex_corners(self.polygon_margin_m))
+
+        candidates = np.vstack(rings + [GeographicUtils.to_array(self.boundary_points)])
+        return candidates[self.obstacle_avoidance.points_are_valid(candidates)] if len(candidates) else candidates
+
+    def plan(self, start: Point, goal: Point, deadline: Optional[float] = None) -> Optional[PointArray]:
+        """
+        Shortest clear polyline from start to goal.
+
+        :param start: Start point
+        :param goal: Goal point
+        :param deadline: time.monotonic() value after which the search gives up with TimeoutError
+        :return: Vertex list [start, ..., goal], or None when no clear path exists in the graph
+        """
+        if not self.obstacle_avoidance.is_point_valid(start) or not self.obstacle_avoidance.is_point_valid(goal):
+            return None
+
+        if self._nodes_version != self.obstacle_avoidance.version:
+            self._nodes = self.build_nodes()
+            self._nodes_version = self.obstacle_avoidance.version
+        nodes = np.vstack([GeographicUtils.to_array([start, goal]), self._nodes])
+        node_count = len(nodes)
+        goal_index = 1
+        heuristic = GeographicUtils.haversine_batch(nodes, nodes[goal_index])
+
+        cost = np.full(node_count, np.inf)
+        cost[0] = 0.0
+        parent = np.full(node_count, -1, dtype=np.intp)
+        closed = np.zeros(node_count, dtype=bool)
+        open_heap = [(heuristic[0], 0)]
+        # Edges from a node are flown once the drone got there along the cheapest path found so far
+        timed = self.obstacle_avoidance.dynamic_columns.size > 0
+        start_time = self.obstacle_avoidance.departure_times(nodes[:1])[0]
+
+        while open_heap:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError("Visibility graph search ran out of time")
+            _, current = heapq.heappop(open_heap)
+            if closed[current]:
+                continue
+            if current == goal_index:
+                return self._reconstruct(nodes, parent, goal_index)
+            closed[current] = True
+
+            neighbours = np.flatnonzero(~closed)
+            departure = start_time + self.obstacle_avoidance.flight_time_s(cost[current]) if timed else None
+            visible = self.obstacle_avoidance.fan_is_valid(nodes[current], nodes[neighbours], departure)
+            neighbours = neighbours[visible]
+
+            tentative = cost[current] + GeographicUtils.haversine_batch(nodes[current], nodes[neighbours])
+            improved = tentative < cost[neighbours]
+            for neighbour, new_cost in zip(neighbours[improved], tentative[improved]):
+                cost[neighbour] = new_cost
+                parent[neighbour] = current
+                heapq.heappush(open_heap, (new_cost + heuristic[neighbour], neighbour))
+
+        return None
+
+    @staticmethod
+    def _reconstruct(nodes: np.ndarray, parent: np.ndarray, goal_index: int) -> PointArray:
+        indices = [goal_index]
+        while parent[indices[-1]] != -1:
+            indices.append(parent[indices[-1]])
+        indices.reverse()
+        return PointArray.from_array(nodes[indices])
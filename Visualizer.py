@@ -1,13 +1,20 @@
-from typing import List
-from matplotlib import pyplot as plt
-from matplotlib.patches import Circle
+import os
+from typing import TYPE_CHECKING, List, Optional
 
 from GeographicUtils import GeographicUtils
-from Point import Point,RedZone
+from Point import Point,PointArray,RedZone
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+# matplotlib is imported inside the plotting functions only, so importing this module (and the
+# planner that depends on it) stays cheap when nothing is ever plotted.
 
 class Visualizer:
     @staticmethod
     def plot_red_zones(ax, red_zones: List[RedZone]):
+        from matplotlib.patches import Circle
+
         for zone in red_zones:
             lat, lon, radius = zone.center.lat, zone.center.lon, zone.radius
             radius_lat, radius_lon = GeographicUtils.meters_to_degrees(radius, lat)
@@ -43,9 +50,7 @@ class Visualizer:
         ax.set_ylim(min_lat - lat_buffer, max_lat + lat_buffer)
     
     @staticmethod
-    def plot_path(path: List[Point], red_zones: List[RedZone], start: Point, goal: Point, middle_points: List[Point] = None,boundary_points:List[Point] = None):
-        fig, ax = plt.subplots()
-        
+    def draw_path(ax, path: List[Point], red_zones: List[RedZone], start: Point, goal: Point, middle_points: List[Point] = None,boundary_points:List[Point] = None):
         Visualizer.plot_red_zones(ax, red_zones)
         Visualizer.plot_points(ax, start, goal, path)
         if middle_points:
@@ -59,6 +64,74 @@ class Visualizer:
         ax.set_title("Red Zones with Drone and Target")
         ax.legend()
 
-        plt.gca().set_aspect('equal', adjustable='box')
-        plt.grid(True)
-        plt.show()
\ No newline at end of file
+        ax.set_aspect('equal', adjustable='box')
+        ax.grid(True)
+
+    @staticmethod
+    def plot_path(path: List[Point], red_zones: List[RedZone], start: Point, goal: Point, middle_points: List[Point] = None,boundary_points:List[Point] = None):
+        from matplotlib import pyplot as plt
+
+        fig, ax = plt.subplots()
+        Visualizer.draw_path(ax, path, red_zones, start, goal, middle_points, boundary_points)
+        plt.show()
+
+
+class NullVisualizer:
+    """
+    Drop-in for Visualizer that does no plotting work at all; use it for production runs.
+    """
+
+    @staticmethod
+    def plot_path(path: List[Point], red_zones: List[RedZone], start: Point, goal: Point, middle_points: List[Point] = None,boundary_points:List[Point] = None):
+        pass
+
+
+class FileVisualizer:
+    """
+    Headless drop-in for Visualizer that renders each plot to a PNG on a background thread.
+
+    plot_path only snapshots its arguments and queues the render, so the planner never waits on
+    matplotlib. Rendering uses the Agg canvas directly instead of pyplot, which keeps it safe off the
+    main thread and independent of the configured GUI backend.
+    """
+
+    def __init__(self, output_dir: str, prefix: str = "path"):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.count = 0
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.pending: List['Future'] = []
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="FileVisualizer")
+        os.makedirs(output_dir, exist_ok=True)
+
+    def plot_path(self, path: List[Point], red_zones: List[RedZone], start: Point, goal: Point, middle_points: List[Point] = None,boundary_points:List[Point] = None) -> str:
+        filename = os.path.join(self.output_dir, f"{self.prefix}_{self.count:04d}.png")
+        self.count += 1
+        # Copy everything now; the planner may keep mutating its lists while the render is queued
+        snapshot = (PointArray(path), list(red_zones), start, goal,
+                    PointArray(middle_points) if middle_points else None,
+                    PointArray(boundary_points) if boundary_points else None)
+        self.pending.append(self.executor.submit(self.render, filename, *snapshot))
+        return filename
+
+    @staticmethod
+    def render(filename: str, path: List[Point], red_zones: List[RedZone], start: Point, goal: Point, middle_points: Optional[List[Point]], boundary_points: Optional[List[Point]]) -> None:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        Visualizer.draw_path(ax, path, red_zones, start, goal, middle_points, boundary_points)
+        fig.savefig(filename)
+
+    def flush(self) -> None:
+        # Wait for every queued render and surface any rendering error
+        pending, self.pending = self.pending, []
+        for future in pending:
+            future.result()
+
+    def close(self) -> None:
+        self.flush()
+        self.executor.shutdown()
@@ -0,0 +1,240 @@
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from DroneNavigator import DroneNavigator
+from GeographicUtils import GeographicUtils
+from ObstacleAvoidance import ObstacleAvoidance
+from PathAdjuster import PathAdjuster
+from PathPlanner import PathPlanner
+from Point import Point,RedZone
+from Visualizer import NullVisualizer
+
+
+@dataclass
+class Scenario:
+    seed: int
+    start: Point
+    goal: Point
+    red_zones: List[RedZone]
+    boundary_points: List[Point]
+    current_yaw: float
+
+
+class ScenarioGenerator:
+    """
+    Reproducible random missions: square field around `center`, zones scattered inside it, start and
+    goal placed in free space. The same seed always yields the same scenario sequence.
+    """
+
+    def __init__(self, seed: int = 0, zone_count: int = 4, radius_min: float = 30, radius_max: float = 170,
+                 radius_distribution: str = 'uniform', boundary_size_m: float = 1000,
+                 min_start_goal_m: float = 200, center: Point = Point(40.23225, 29.00325)):
+        if radius_distribution not in ('uniform', 'lognormal'):
+            raise ValueError(f"Unknown radius distribution {radius_distribution!r}")
+        self.seed = seed
+        self.zone_count = zone_count
+        self.radius_min = radius_min
+        self.radius_max = radius_max
+        self.radius_distribution = radius_distribution
+        self.boundary_size_m = boundary_size_m
+        self.min_start_goal_m = min_start_goal_m
+        self.center = center
+
+    def config(self) -> dict:
+        return {'seed': self.seed, 'zone_count': self.zone_count, 'radius_min': self.radius_min,
+                'radius_max': self.radius_max, 'radius_distribution': self.radius_distribution,
+                'boundary_size_m': self.boundary_size_m, 'min_start_goal_m': self.min_start_goal_m,
+                'center': [self.center.lat, self.center.lon]}
+
+    def radius(self, rng: random.Random) -> float:
+        if self.radius_distribution == 'uniform':
+            return rng.uniform(self.radius_min, self.radius_max)
+        # Log-normal centred on the geometric mean of the bounds, clipped into them
+        mu = (np.log(self.radius_min) + np.log(self.radius_max)) / 2
+        return min(max(rng.lognormvariate(mu, 0.5), self.radius_min), self.radius_max)
+
+    def generate(self, index: int) -> Scenario:
+        seed = self.seed * 1_000_003 + index
+        rng = random.Random(seed)
+        half_lat, half_lon = GeographicUtils.meters_to_degrees(self.boundary_size_m / 2, self.center.lat)
+        boundary_points = [
+            Point(self.center.lat - half_lat, self.center.lon - half_lon),
+            Point(self.center.lat - half_lat, self.center.lon + half_lon),
+            Point(self.center.lat + half_lat, self.center.lon + half_lon),
+            Point(self.center.lat + half_lat, self.center.lon - half_lon),
+        ]
+
+        def random_point() -> Point:
+            return Point(self.center.lat + rng.uniform(-half_lat, half_lat), self.center.lon + rng.uniform(-half_lon, half_lon))
+
+        red_zones = [RedZone(zone_id, random_point(), self.radius(rng)) for zone_id in range(self.zone_count)]
+        obstacle_avoidance = ObstacleAvoidance(red_zones, boundary_points)
+
+        def free_point() -> Point:
+            for _ in range(10000):
+                point = random_point()
+                if obstacle_avoidance.is_point_valid(point):
+                    return point
+            raise RuntimeError(f"Scenario {index}: no free space left for start/goal")
+
+        start = free_point()
+        goal = free_point()
+        while GeographicUtils.haversine(start, goal) * 1000 < self.min_start_goal_m:
+            goal = free_point()
+
+        return Scenario(seed, start, goal, red_zones, boundary_points, rng.uniform(0, 360))
+
+
+def summarize(samples_s: List[float]) -> Dict[str, float]:
+    samples_ms = np.array(samples_s) * 1000
+    return {'p50': float(np.percentile(samples_ms, 50)), 'p90': float(np.percentile(samples_ms, 90)),
+            'p99': float(np.percentile(samples_ms, 99)), 'mean': float(samples_ms.mean()),
+            'max': float(samples_ms.max())}
+
+
+def measure(function: Callable[[], object], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def peak_memory_kb(function: Callable[[], object]) -> float:
+    # Separate pass: tracemalloc slows allocation down, so it never runs during timing
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run(generator: ScenarioGenerator, scenario_count: int, repeat: int, planner: str, adaptive_step: bool = False) -> dict:
+    stages = {name: {'samples': [], 'peak_kb': 0.0} for name in
+              ('generate_waypoints', 'obstacle_checks', 'adjust_initial_path', 'navigate')}
+    successes = 0
+    waypoint_counts = []
+
+    def record(name: str, function: Callable[[], object]) -> None:
+        stages[name]['samples'] += measure(function, repeat)
+        stages[name]['peak_kb'] = max(stages[name]['peak_kb'], peak_memory_kb(function))
+
+    for index in range(scenario_count):
+        scenario = generator.generate(index)
+        path_planner = PathPlanner(scenario.start, scenario.goal, scenario.red_zones, scenario.boundary_points,
+                                   adaptive_step=adaptive_step)
+        obstacle_avoidance = ObstacleAvoidance(scenario.red_zones, scenario.boundary_points)
+        direct_path = path_planner.generate_waypoints(scenario.start, scenario.goal)
+
+        def navigate() -> list:
+            navigator = DroneNavigator(scenario.start, scenario.goal, scenario.red_zones, scenario.current_yaw,
+                                       scenario.boundary_points, planner=planner, visualizer=NullVisualizer,
+                                       adaptive_step=adaptive_step)
+            return list(navigator.navigate())
+
+        # Measure generation itself, not the waypoint cache
+        record('generate_waypoints', lambda: (path_planner.waypoint_cache.clear(),
+                                              path_planner.generate_waypoints(scenario.start, scenario.goal)))
+        record('obstacle_checks', lambda: (obstacle_avoidance.path_is_clear_of_red_zones(direct_path),
+                                           obstacle_avoidance.is_path_valid(direct_path)))
+        record('adjust_initial_path', lambda: PathAdjuster().adjust_initial_path(scenario.current_yaw, direct_path, 7))
+        record('navigate', navigate)
+        path = navigate()
+        waypoint_counts.append(len(path))
+
+        if obstacle_avoidance.is_path_valid(path):
+            successes += 1
+
+    return {
+        'config': dict(generator.config(), scenarios=scenario_count, repeat=repeat, planner=planner,
+                       adaptive_step=adaptive_step),
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform()},
+        'stages': {name: {'runs': len(stage['samples']), 'latency_ms': summarize(stage['samples']),
+                          'peak_memory_kb': stage['peak_kb']} for name, stage in stages.items()},
+        'waypoints_per_mission': float(np.mean(waypoint_counts)),
+        'success_rate': successes / scenario_count,
+    }
+
+
+# Modules that must only load when plotting, smoothing or process pools are actually used
+LAZY_MODULES = ('matplotlib', 'scipy', 'concurrent.futures', 'PathSmoother', 'VisibilityGraphPlanner')
+
+
+def import_profile(module: str) -> Dict[str, Dict[str, int]]:
+    """
+    Import module in a fresh interpreter under -X importtime.
+
+    :return: {module name: {'self_us': ..., 'cumulative_us': ...}} for every module it loaded
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True)
+    profile = {}
+    for line in result.stderr.splitlines():
+        fields = line.removeprefix('import time:').split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        profile[fields[2].strip()] = {'self_us': int(fields[0]), 'cumulative_us': int(fields[1])}
+    return profile
+
+
+def run_startup(module: str, repeat: int, top: int = 10) -> dict:
+    profiles = [import_profile(module) for _ in range(repeat)]
+    # The slowest modules by their own import time, median over runs so one cold cache doesn't dominate
+    self_us = {name: float(np.median([profile.get(name, {'self_us': 0})['self_us'] for profile in profiles]))
+               for name in profiles[-1]}
+    return {
+        'config': {'module': module, 'repeat': repeat},
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform()},
+        'import_ms': summarize([profile[module]['cumulative_us'] / 1e6 for profile in profiles]),
+        'modules_loaded': len(profiles[-1]),
+        'slowest_modules_ms': {name: us / 1000 for name, us in sorted(self_us.items(), key=lambda item: -item[1])[:top]},
+        'eager_heavy_modules': [name for name in LAZY_MODULES if name in profiles[-1]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the planning pipeline on reproducible random scenarios.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenarios', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per stage and scenario")
+    parser.add_argument('--zones', type=int, default=4)
+    parser.add_argument('--radius-min', type=float, default=30)
+    parser.add_argument('--radius-max', type=float, default=170)
+    parser.add_argument('--radius-distribution', choices=('uniform', 'lognormal'), default='uniform')
+    parser.add_argument('--boundary-size', type=float, default=1000, help="side of the square field in meters")
+    parser.add_argument('--planner', choices=DroneNavigator.PLANNERS, default='greedy')
+    parser.add_argument('--adaptive-step', action='store_true', help="sparse waypoints away from obstacles")
+    parser.add_argument('--startup', metavar='MODULE', nargs='?', const='DroneNavigator',
+                        help="instead of planning, profile the cold import of MODULE (default DroneNavigator) --repeat times")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.startup:
+        report = run_startup(args.startup, args.repeat)
+    else:
+        generator = ScenarioGenerator(args.seed, args.zones, args.radius_min, args.radius_max,
+                                      args.radius_distribution, args.boundary_size)
+        report = run(generator, args.scenarios, args.repeat, args.planner, args.adaptive_step)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
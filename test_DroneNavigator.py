@@ -0,0 +1,34 @@
+from DroneNavigator import DroneNavigator
+from Point import Point, RedZone
+from Visualizer import NullVisualizer
+
+BOUNDARY_POINTS = [Point(40.22850, 28.99750), Point(40.22850, 29.00900), Point(40.23600, 29.00900), Point(40.23600, 28.99750)]
+
+
+def navigator(goal: Point, red_zones, current_yaw: float = 90) -> DroneNavigator:
+    return DroneNavigator(Point(40.23100, 28.99900), goal, red_zones, current_yaw, BOUNDARY_POINTS, visualizer=NullVisualizer)
+
+
+def test_plan_within_is_optimal_when_the_search_finds_the_path():
+    nav = navigator(Point(40.23100, 29.00700), [RedZone(0, Point(40.23100, 29.00300), 120)])
+    result = nav.plan_within(1000)
+    assert result.status == 'optimal'
+    assert not nav.visibility_fallbacks
+    assert nav.obstacle_avoidance.is_path_valid(result.path.vertices)
+
+
+def test_plan_within_never_reports_the_direct_fallback_as_optimal():
+    # The goal sits inside a zone, so the search finds nothing and the direct path stands in for it
+    nav = navigator(Point(40.23100, 29.00700), [RedZone(0, Point(40.23100, 29.00700), 100)])
+    result = nav.plan_within(1000)
+    assert nav.visibility_fallbacks
+    assert result.status == 'fallback'
+
+
+def test_plan_within_rejects_paths_leaving_the_fence():
+    # Right at the east fence and heading out of it, every path swings outside while turning back
+    nav = DroneNavigator(Point(40.23100, 29.00890), Point(40.23100, 28.99900), [], 90, BOUNDARY_POINTS, visualizer=NullVisualizer)
+    result = nav.plan_within(1000)
+    assert nav.obstacle_avoidance.path_is_clear_of_red_zones(result.path.vertices)
+    assert not nav.obstacle_avoidance.is_path_valid(result.path.vertices)
+    assert result.status == 'fallback'
@@ -0,0 +1,103 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from GeographicUtils import GeographicUtils
+from Point import Point
+
+# Scalar and batch kernels evaluate the same formulas, so only floating-point reordering separates them
+DISTANCE_TOLERANCE_KM = 1e-9
+ANGLE_TOLERANCE_DEG = 1e-9
+# The bearing of a metre-long leg comes from differences of nearly equal sines, so it is ill-conditioned
+# and rounding can move it by a few 1e-9 degrees
+BEARING_TOLERANCE_DEG = 1e-7
+
+
+def random_pairs(seed: int, count: int = 2000):
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        start = Point(rng.uniform(-85, 85), rng.uniform(-180, 180))
+        # Mostly mission-sized legs, some across the globe
+        spread = rng.choice((0.001, 0.05, 5.0, 60.0))
+        end = Point(max(-89.9, min(89.9, start.lat + rng.uniform(-spread, spread))), start.lon + rng.uniform(-spread, spread))
+        pairs.append((start, end))
+    # Coincident points and exact north/south legs, where the bearing sits on the 0/360 seam
+    pairs += [(Point(40.23, 29.0), Point(40.23, 29.0)), (Point(0.0, 0.0), Point(0.0, 0.0)),
+              (Point(40.23, 29.0), Point(40.24, 29.0)), (Point(40.23, 29.0), Point(40.22, 29.0)),
+              (Point(40.23, 29.0), Point(40.24, 28.9999999)), (Point(40.23, 29.0), Point(40.24, 29.0000001))]
+    return pairs
+
+
+def as_arrays(pairs):
+    return (np.array([(start.lat, start.lon) for start, _ in pairs]),
+            np.array([(end.lat, end.lon) for _, end in pairs]))
+
+
+def angle_difference(first, second):
+    # Smallest separation on the circle, so 359.9999 and 0.0001 are close
+    return np.abs((np.asarray(first) - np.asarray(second) + 180) % 360 - 180)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_haversine_batch_matches_scalar(seed):
+    pairs = random_pairs(seed)
+    starts, ends = as_arrays(pairs)
+    scalar = np.array([GeographicUtils.haversine(start, end) for start, end in pairs])
+    np.testing.assert_allclose(GeographicUtils.haversine_batch(starts, ends), scalar, rtol=0, atol=DISTANCE_TOLERANCE_KM)
+
+
+def test_haversine_of_coincident_points_is_zero():
+    coords = np.array([[40.23, 29.0], [0.0, 0.0], [-33.9, 151.2]])
+    assert (GeographicUtils.haversine_batch(coords, coords) == 0).all()
+    assert all(GeographicUtils.haversine(Point(*row), Point(*row)) == 0 for row in coords)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_calculate_bearing_batch_matches_scalar(seed):
+    pairs = random_pairs(seed)
+    starts, ends = as_arrays(pairs)
+    scalar = np.array([GeographicUtils.calculate_bearing(start, end) for start, end in pairs])
+    batch = GeographicUtils.calculate_bearing_batch(starts, ends)
+    assert ((batch >= 0) & (batch < 360)).all()
+    assert angle_difference(batch, scalar).max() <= BEARING_TOLERANCE_DEG
+
+
+def test_bearing_wraps_around_north():
+    start = Point(40.23, 29.0)
+    ends = [Point(40.24, 29.0), Point(40.24, 28.9999999), Point(40.24, 29.0000001)]
+    batch = GeographicUtils.calculate_bearing_batch(np.array([(start.lat, start.lon)]), np.array([(end.lat, end.lon) for end in ends]))
+    scalar = [GeographicUtils.calculate_bearing(start, end) for end in ends]
+    assert scalar[0] == 0 and scalar[1] > 359.99 and scalar[2] < 0.01
+    assert angle_difference(batch, scalar).max() <= BEARING_TOLERANCE_DEG
+    assert angle_difference(batch, 0).max() < 0.01
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_point_with_bearing_batch_matches_scalar(seed):
+    rng = random.Random(seed)
+    pairs = random_pairs(seed)
+    starts, _ = as_arrays(pairs)
+    distances = np.array([rng.choice((0.0, 10.0, rng.uniform(0, 5000), rng.uniform(0, 2e6))) for _ in pairs])
+    # Bearings on and around the 0/360 seam as well as arbitrary ones, some outside [0, 360)
+    bearings = np.array([rng.choice((0.0, 360.0, 359.9999999, 1e-7, -90.0, rng.uniform(0, 360), rng.uniform(-720, 720)))
+                         for _ in pairs])
+    batch = GeographicUtils.point_with_bearing_batch(starts, distances, bearings)
+    scalar = np.array([(point.lat, point.lon) for point in
+                       (GeographicUtils.point_with_bearing(start, distance, bearing)
+                        for (start, _), distance, bearing in zip(pairs, distances, bearings))])
+    assert np.abs(batch[:, 0] - scalar[:, 0]).max() <= ANGLE_TOLERANCE_DEG
+    assert angle_difference(batch[:, 1], scalar[:, 1]).max() <= ANGLE_TOLERANCE_DEG
+
+
+def test_point_with_bearing_batch_broadcasts_scalar_arguments():
+    start = Point(40.23, 29.0)
+    bearings = np.array([0.0, 90.0, 180.0, 270.0, 360.0])
+    batch = GeographicUtils.point_with_bearing_batch(np.array([start.lat, start.lon]), 100.0, bearings)
+    assert batch.shape == (5, 2)
+    for row, bearing in zip(batch, bearings):
+        point = GeographicUtils.point_with_bearing(start, 100.0, bearing)
+        assert math.isclose(row[0], point.lat, abs_tol=ANGLE_TOLERANCE_DEG)
+        assert math.isclose(row[1], point.lon, abs_tol=ANGLE_TOLERANCE_DEG)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from GeographicUtils import GeographicUtils
+from LocalFrame import LocalFrame
+from Point import Point
+
+
+def points_around(origin: Point, radius_m: float, count: int, rng: np.random.Generator) -> np.ndarray:
+    # (lat, lon) rows within radius_m of origin, a quarter of them on the rim where distortion peaks
+    distances = radius_m * np.sqrt(rng.uniform(0, 1, count))
+    distances[:count // 4] = radius_m
+    return GeographicUtils.point_with_bearing_batch(np.array([origin.lat, origin.lon]), distances * (6378137 / LocalFrame.R),
+                                                    rng.uniform(0, 360, count))
+
+
+@pytest.mark.parametrize('lat', [0.0, 40.0, 70.0])
+@pytest.mark.parametrize('radius_km', [1.0, 3.0, 10.0])
+def test_planar_distance_error_is_within_documented_bound(lat, radius_km):
+    origin = Point(lat, 29.0)
+    frame = LocalFrame(origin)
+    rng = np.random.default_rng(int(lat * 100 + radius_km))
+    coords = points_around(origin, radius_km * 1000, 400, rng)
+    starts, ends = coords[:200], coords[200:]
+    enu_starts, enu_ends = frame.to_enu(starts), frame.to_enu(ends)
+    planar = np.hypot(*(enu_ends - enu_starts).T)
+    true = GeographicUtils.haversine_batch(starts, ends) * 1000
+    bound = (radius_km * 1000 / LocalFrame.R) ** 2
+    relative = (planar - true) / true
+    # Gnomonic scale only grows away from the origin, so planar never under-estimates beyond rounding
+    assert relative.min() >= -1e-9
+    assert relative.max() <= bound
+    # Origin to rim is the worst case for radial distances and must sit within the bound too
+    radial = np.hypot(*frame.to_enu(coords).T)
+    true_radial = GeographicUtils.haversine_batch(coords, np.array([origin.lat, origin.lon])) * 1000
+    assert (np.abs(radial - true_radial) <= bound * true_radial + 1e-6).all()
+
+
+@pytest.mark.parametrize('lat', [0.0, 40.0, 70.0])
+@pytest.mark.parametrize('radius_km', [1.0, 3.0, 10.0])
+def test_enu_round_trip(lat, radius_km):
+    origin = Point(lat, 29.0)
+    frame = LocalFrame(origin)
+    coords = points_around(origin, radius_km * 1000, 500, np.random.default_rng(7))
+    round_trip = frame.to_geodetic(frame.to_enu(coords))
+    # 1e-10 degrees is about 1e-5 m
+    np.testing.assert_allclose(round_trip, coords, rtol=0, atol=1e-10)
+    np.testing.assert_allclose(frame.to_enu(frame.to_geodetic(frame.to_enu(coords))), frame.to_enu(coords), rtol=0, atol=1e-6)
+
+
+def test_origin_maps_to_zero():
+    frame = LocalFrame(Point(40.23, 29.0))
+    np.testing.assert_allclose(frame.to_enu(np.array([40.23, 29.0])), [0.0, 0.0], atol=1e-9)
+    np.testing.assert_allclose(frame.to_geodetic(np.zeros(2)), [40.23, 29.0], atol=1e-12)
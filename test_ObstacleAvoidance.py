@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from GeographicUtils import GeographicUtils
+from LocalFrame import LocalFrame
+from ObstacleAvoidance import ObstacleAvoidance
+from Point import Point, RedZone
+
+BOUNDARY_POINTS = [Point(39.0, 28.0), Point(39.0, 30.0), Point(41.5, 30.0), Point(41.5, 28.0)]
+
+
+def closest_approach_m(start: Point, end: Point, center: np.ndarray) -> float:
+    # Brute force along the great-circle leg, finest around the closest sample
+    frame = LocalFrame(start)
+    fractions = np.linspace(0, 1, 20001)
+    distances = GeographicUtils.haversine_batch(frame.leg_points(start, end, fractions), center)
+    nearest = fractions[np.argmin(distances)]
+    fractions = np.concatenate([[0.0], np.linspace(max(nearest - 1e-4, 0), min(nearest + 1e-4, 1), 20001)])
+    return GeographicUtils.haversine_batch(frame.leg_points(start, end, fractions)[1:], center).min() * 1000
+
+
+@pytest.mark.parametrize('length_km', [8.3, 15.0, 30.0])
+@pytest.mark.parametrize('bearing', [10.0, 45.0, 80.0])
+def test_geodetic_entries_follow_long_great_circle_legs(length_km, bearing):
+    # Zone beside the far half of a long, slanted leg, where a flat lat/lon scale taken at the start is metres off
+    start = Point(40.0, 29.0)
+    end = Point(*GeographicUtils.point_with_bearing_batch(np.array([start.lat, start.lon]), length_km * 1000 * 6378137 / LocalFrame.R, bearing))
+    beside = LocalFrame(start).leg_points(start, end, np.array([0.0, 0.7]))[1]
+    center = GeographicUtils.point_with_bearing_batch(beside, 150.0, bearing - 90)
+    distance_m = closest_approach_m(start, end, center)
+    for inflated_m, crosses in ((distance_m + 0.05, True), (distance_m - 0.05, False)):
+        obstacle_avoidance = ObstacleAvoidance([RedZone(0, Point(*center), inflated_m * 6 / 7)], BOUNDARY_POINTS)
+        entries = obstacle_avoidance.segment_zone_entries([start, end])
+        assert (not np.isnan(entries).all()) == crosses
@@ -0,0 +1,57 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from ObstacleAvoidance import ObstacleAvoidance
+from Point import Point
+from PolygonGeofence import PolygonGeofence
+
+BOX = [Point(40.2285, 28.9975), Point(40.2285, 29.0090), Point(40.2360, 29.0090), Point(40.2360, 28.9975)]
+
+
+def star(count: int, seed: int):
+    # Random simple polygon: vertices sorted by angle around a centre, at random radii
+    rng = np.random.default_rng(seed)
+    angles = np.sort(rng.uniform(0, 2 * math.pi, count))
+    radii = rng.uniform(0.002, 0.01, count)
+    return [Point(40.23 + radius * math.sin(angle), 29.0 + radius * math.cos(angle)) for angle, radius in zip(angles, radii)]
+
+
+def test_box_corners_in_any_boundary_order_are_accepted():
+    for shift in range(4):
+        for corners in (BOX[shift:] + BOX[:shift], (BOX[shift:] + BOX[:shift])[::-1]):
+            assert PolygonGeofence(corners).contains(np.array([[40.23, 29.0]]))[0]
+
+
+def test_box_corners_out_of_boundary_order_are_rejected():
+    # Every ordering that isn't a rotation or reversal of the boundary is a bow tie
+    boundary_orders = {tuple(BOX[shift:] + BOX[:shift]) for shift in range(4)}
+    boundary_orders |= {order[::-1] for order in boundary_orders}
+    crossed = [list(order) for order in itertools.permutations(BOX) if order not in boundary_orders]
+    assert len(crossed) == 16
+    for corners in crossed:
+        with pytest.raises(ValueError, match='cross'):
+            PolygonGeofence(corners)
+
+
+def test_flat_edge_crossing_is_rejected():
+    # The flat edge from the last vertex back to the first cuts through the two slanted edges
+    with pytest.raises(ValueError, match='cross'):
+        PolygonGeofence([Point(40.23, 28.99), Point(40.22, 29.0), Point(40.24, 29.0), Point(40.23, 29.01)])
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_simple_polygons_are_accepted_and_shuffled_ones_rejected(seed):
+    vertices = star(12, seed)
+    PolygonGeofence(vertices)
+    shuffled = [vertices[i] for i in np.random.default_rng(seed).permutation(len(vertices))]
+    if shuffled != vertices:
+        with pytest.raises(ValueError, match='cross'):
+            PolygonGeofence(shuffled)
+
+
+def test_obstacle_avoidance_rejects_crossed_fence():
+    with pytest.raises(ValueError, match='cross'):
+        ObstacleAvoidance([], [BOX[0], BOX[2], BOX[1], BOX[3]])